@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+ZephyrUI 文档工具性能基准
+按指定规模生成合成文档语料（frontmatter、带 emoji 的章节标题、dart 代码块、表格、
+内外部链接和中文正文），逐个运行文档脚本，记录吞吐量（文件/秒）和峰值内存，
+并与保存的基线比较以发现性能回退；--parser 模式对病态输入计时文档解析
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional
+from dataclasses import dataclass, asdict
+from datetime import datetime
+
+from markdown_document import MarkdownDocument
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+CATEGORIES = ['basic', 'form', 'navigation', 'display', 'feedback', 'layout', 'advanced']
+GUIDE_DIRS = ['guides', 'getting-started', 'api', 'design']
+SECTIONS = ['🎯 组件概述', '🚀 基础用法', '🎨 样式定制', '🎛️ API 参考', '🏆 最佳实践',
+            '🔄 相关组件', '📝 更新日志', '❓ 常见问题', '⚡ 性能优化', '♿ 无障碍']
+PHRASES = ['该组件提供了灵活的配置选项', '支持完整的主题定制', '在移动端和桌面端表现一致',
+           '可以与表单组件组合使用', '遵循 Material Design 设计规范', '默认开启无障碍支持',
+           '推荐在列表中复用实例以减少重建', '所有颜色都从主题中读取', '动画时长可以全局配置',
+           '事件回调在主线程中执行', '支持国际化和从右到左布局', '尺寸会随文字缩放自动调整']
+EXTERNAL_LINKS = ['https://flutter.dev/docs', 'https://api.flutter.dev/flutter/widgets/Widget-class.html',
+                  'https://pub.dev/packages/zephyr_ui', 'https://dart.dev/guides/language',
+                  'https://m3.material.io/components', 'https://github.com/flutter/flutter/issues']
+PROPERTY_TYPES = ['String', 'String?', 'bool', 'double?', 'Color?', 'VoidCallback?', 'Widget?', 'EdgeInsets?']
+
+@dataclass
+class BenchmarkResult:
+    """单个工具在单个语料规模上的运行结果"""
+    tool: str
+    files: int
+    seconds: Optional[float]  # 运行失败时为 None，失败的运行不代表真实的吞吐量和内存
+    files_per_sec: Optional[float]
+    peak_memory_kb: Optional[int]
+    returncode: int
+
+# 各工具的运行方式：命令行参数、计数的文件类型和会写入的语料目录
+TOOLS = {
+    'formatter': {'script': 'docs-formatter.py', 'args': []},
+    'quality-checker': {'script': 'docs-quality-checker.py', 'args': ['--docs-dir', 'doc', '--no-cache']},
+    'link-checker': {'script': 'link-checker.py',
+                     'args': ['--docs-dir', 'doc', '--no-cache', '--replay', 'cassette.json']},
+    'updater': {'script': 'update-docs.py', 'args': ['--docs-dir', 'doc', '--version', '9.9.9']},
+    'generator': {'script': 'docs-generator.py', 'args': [], 'counts': 'dart'},
+}
+# docs-generator.py 生成概览文档时总是抛出 IndexError，修复之前不默认运行
+DEFAULT_TOOLS = [tool for tool in TOOLS if tool != 'generator']
+
+# 解析器的病态输入：每种输入重复一个片段到约 100 KB，曾让导语正则回溯到数小时
+PARSER_INPUT_SIZE = 100 * 1024
+PARSER_CASES = {
+    'repeated-rules': ('---\ntitle: Rules\n---\n\n', '该组件提供了灵活的配置选项。\n---\n'),
+    'unclosed-frontmatter': ('---\n', 'description: 没有闭合的 frontmatter\n'),
+    'lead-without-heading': ('---\ntitle: Lead\n---\n\n', '支持完整的主题定制，'),
+    'dash-lines': ('', '---\n'),
+}
+
+class CorpusGenerator:
+    """按固定随机种子生成可复现的合成文档语料"""
+
+    def __init__(self, root: Path, seed: int = 42):
+        self.root = Path(root)
+        self.random = random.Random(seed)
+        self.pages: List[Path] = []
+
+    def sentence(self) -> str:
+        """随机组合一句中文正文"""
+        return '，'.join(self.random.sample(PHRASES, self.random.randint(1, 3))) + '。'
+
+    def plan_pages(self, size: int):
+        """先确定所有页面路径，正文中的内部链接才能指向真实存在的文件"""
+        self.pages = []
+        for index in range(size):
+            if index % 5 == 4:
+                directory = Path('doc') / self.random.choice(GUIDE_DIRS)
+                name = f"guide-{index}.md"
+            else:
+                directory = Path('doc') / 'components' / CATEGORIES[index % len(CATEGORIES)]
+                name = f"zephyr-widget-{index}.md"
+            self.pages.append(directory / name)
+
+    def internal_link(self, page: Path) -> str:
+        """指向另一个页面的相对链接，少数带锚点或指向不存在的文件"""
+        target = self.random.choice(self.pages)
+        href = os.path.relpath(target, page.parent).replace(os.sep, '/')
+        roll = self.random.random()
+        if roll < 0.05:
+            href = href.replace('.md', '-missing.md')
+        elif roll < 0.25:
+            href += '#' + self.random.choice(['组件概述', '基础用法', 'api-参考'])
+        return f"[{target.stem}]({href})"
+
+    def table(self) -> List[str]:
+        """属性表格，部分单元格保留不齐的空格供格式化工具处理"""
+        rows = ['| 属性 | 类型 | 默认值 | 说明 |', '|------|------|--------|------|']
+        for _ in range(self.random.randint(2, 8)):
+            name = self.random.choice(['child', 'onPressed', 'size', 'color', 'label', 'enabled', 'padding'])
+            padding = ' ' * self.random.randint(1, 4)
+            rows.append(f"| {name}{padding}| {self.random.choice(PROPERTY_TYPES)} | - |{padding}{self.sentence()} |")
+        return rows
+
+    def code_block(self, name: str) -> List[str]:
+        """dart 代码块，少数不带语言标识"""
+        info = 'dart' if self.random.random() < 0.9 else ''
+        body = [f"{name}(", "  onPressed: () => print('点击'),", "  child: Text('示例'),", ")"]
+        return [f"```{info}", *body, "```"]
+
+    def page_content(self, page: Path) -> str:
+        """生成单个页面的 Markdown 内容"""
+        name = page.stem.replace('-', ' ').title().replace(' ', '')
+        lines = []
+        if self.random.random() < 0.95:
+            lines += ['---', f"title: {name}", f"description: {name} 组件的使用说明，{self.sentence()}",
+                      'version: 1.0.0', 'last_updated: 2024-01-01', '---', '']
+        lines += [f"# {name}", '', self.sentence() * 2, '']
+        for section in self.random.sample(SECTIONS, self.random.randint(3, len(SECTIONS))):
+            lines += [f"## {section}", '']
+            for _ in range(self.random.randint(1, 3)):
+                kind = self.random.random()
+                if kind < 0.35:
+                    lines += self.code_block(name)
+                elif kind < 0.5:
+                    lines += self.table()
+                else:
+                    paragraph = self.sentence() * self.random.randint(1, 4)
+                    if self.random.random() < 0.6:
+                        paragraph += f"详见{self.internal_link(page)}。"
+                    if self.random.random() < 0.3:
+                        paragraph += f"参考 [官方文档]({self.random.choice(EXTERNAL_LINKS)})。"
+                    lines.append(paragraph)
+                lines.append('')
+        return '\n'.join(lines)
+
+    def component_source(self, index: int) -> str:
+        """供文档生成器解析的 Dart 组件源码"""
+        properties = self.random.sample(['child', 'onPressed', 'label', 'size', 'color', 'enabled'],
+                                        self.random.randint(2, 5))
+        params = '\n'.join(f"    this.{prop}," for prop in properties)
+        fields = '\n'.join(f"  /// {self.sentence()}\n  final {self.random.choice(PROPERTY_TYPES)} {prop};"
+                           for prop in properties)
+        return (f"/// ZephyrWidget{index} 组件，{self.sentence()}\n"
+                f"class ZephyrWidget{index} extends StatelessWidget {{\n"
+                f"  const ZephyrWidget{index}({{\n    super.key,\n{params}\n  }});\n\n{fields}\n\n"
+                f"  @override\n  Widget build(BuildContext context) {{\n    return const SizedBox();\n  }}\n}}\n")
+
+    def generate(self, size: int):
+        """生成 size 个 Markdown 页面、同样数量的 Dart 组件文件和空的外部链接录制文件"""
+        self.plan_pages(size)
+        for page in self.pages:
+            path = self.root / page
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(self.page_content(page), encoding='utf-8')
+
+        for index in range(size):
+            path = self.root / 'lib' / 'src' / 'components' / CATEGORIES[index % len(CATEGORIES)] / f"widget_{index}.dart"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(self.component_source(index), encoding='utf-8')
+
+        # 外部链接检查只回放，不访问网络
+        (self.root / 'cassette.json').write_text(json.dumps({'entries': {}}), encoding='utf-8')
+
+def run_tool(tool: str, corpus: Path, work_dir: Path, repeat: int = 3) -> BenchmarkResult:
+    """把语料复制到独立目录后运行工具，取最快的一次耗时和最大的峰值内存
+
+    工具会改写语料，每次运行前都重新复制；峰值内存用 wait4 取得子进程自身的 ru_maxrss
+    """
+    spec = TOOLS[tool]
+    pattern = '*.dart' if spec.get('counts') == 'dart' else '*.md'
+    files = sum(1 for _ in corpus.rglob(pattern))
+
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(SCRIPTS_DIR), os.environ.get('PYTHONPATH')])))
+    command = [sys.executable, str(SCRIPTS_DIR / spec['script']), *spec['args']]
+    best = None
+    peak_memory_kb = 0
+    returncode = 0
+    for _ in range(max(1, repeat)):
+        shutil.rmtree(work_dir, ignore_errors=True)
+        shutil.copytree(corpus, work_dir)
+        start = time.perf_counter()
+        process = subprocess.Popen(command, cwd=work_dir, env=env,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        _, status, usage = os.wait4(process.pid, 0)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+        peak_memory_kb = max(peak_memory_kb, usage.ru_maxrss)
+        returncode = returncode or os.waitstatus_to_exitcode(status)
+
+    if returncode != 0:
+        return BenchmarkResult(tool=tool, files=files, seconds=None, files_per_sec=None,
+                               peak_memory_kb=None, returncode=returncode)
+    return BenchmarkResult(
+        tool=tool,
+        files=files,
+        seconds=round(best, 3),
+        files_per_sec=round(files / best, 1) if best > 0 else 0.0,
+        peak_memory_kb=peak_memory_kb,
+        returncode=returncode
+    )
+
+def run_parser_benchmark(repeat: int = 3) -> List[Dict]:
+    """对每种病态输入计时 MarkdownDocument.parse（包括导语扫描），取最快的一次"""
+    results = []
+    for case, (head, unit) in PARSER_CASES.items():
+        content = head + unit * (PARSER_INPUT_SIZE // len(unit.encode('utf-8')) + 1)
+        best = None
+        for _ in range(max(1, repeat)):
+            start = time.perf_counter()
+            MarkdownDocument.parse(content)
+            seconds = time.perf_counter() - start
+            best = seconds if best is None else min(best, seconds)
+        results.append({'case': case, 'bytes': len(content.encode('utf-8')), 'seconds': round(best, 4)})
+    return results
+
+def find_regressions(results: Dict[str, List[Dict]], baseline: Dict[str, List[Dict]],
+                     tolerance: float) -> List[str]:
+    """吞吐量下降或峰值内存上升超过 tolerance 比例，或基线中正常退出的工具运行失败，都记为回退
+
+    任一方运行失败时没有可比较的测量值，不比较吞吐量和内存
+    """
+    regressions = []
+    for size, runs in results.items():
+        previous = {run['tool']: run for run in baseline.get(size, [])}
+        for run in runs:
+            base = previous.get(run['tool'])
+            if base is None:
+                continue
+            if run['returncode'] != 0 and base['returncode'] == 0:
+                regressions.append(f"{run['tool']} @ {size}: 运行失败（退出码 {run['returncode']}）")
+                continue
+            if run['returncode'] != 0 or base['returncode'] != 0:
+                continue
+            if run['files_per_sec'] < base['files_per_sec'] * (1 - tolerance):
+                regressions.append(f"{run['tool']} @ {size}: 吞吐量 {base['files_per_sec']} -> "
+                                   f"{run['files_per_sec']} 文件/秒")
+            if run['peak_memory_kb'] > base['peak_memory_kb'] * (1 + tolerance):
+                regressions.append(f"{run['tool']} @ {size}: 峰值内存 {base['peak_memory_kb']} -> "
+                                   f"{run['peak_memory_kb']} KB")
+    return regressions
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="ZephyrUI 文档工具性能基准")
+    parser.add_argument('--sizes', default='100,1000', help='语料规模（Markdown 文件数），逗号分隔')
+    parser.add_argument('--tools', default=','.join(DEFAULT_TOOLS), help='要测试的工具，逗号分隔（generator 需要显式指定）')
+    parser.add_argument('--seed', type=int, default=42, help='语料生成的随机种子')
+    parser.add_argument('--output', '-o', default='docs-benchmark-report.json', help='基准结果文件')
+    parser.add_argument('--baseline', default='.docs-benchmark-baseline.json', help='基线文件')
+    parser.add_argument('--save-baseline', action='store_true', help='把本次结果保存为基线')
+    parser.add_argument('--repeat', type=int, default=3, help='每个工具重复运行的次数，取最快的一次')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='允许的性能波动比例')
+    parser.add_argument('--keep', metavar='DIR', help='把生成的语料保留到该目录，不运行工具')
+    parser.add_argument('--parser', action='store_true',
+                        help='只对约 100 KB 的病态输入计时文档解析，不生成语料也不运行工具')
+    parser.add_argument('--parser-budget', type=float, default=1.0,
+                        help='--parser 模式下每种输入允许的最长解析时间（秒）')
+
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+    tools = [tool for tool in args.tools.split(',') if tool]
+    unknown = [tool for tool in tools if tool not in TOOLS]
+    if unknown:
+        parser.error(f"未知的工具: {', '.join(unknown)}（可选: {', '.join(TOOLS)}）")
+
+    if args.parser:
+        slow = []
+        for result in run_parser_benchmark(repeat=args.repeat):
+            print(f"  {result['case']:22} {result['bytes'] / 1024:8.1f} KB {result['seconds'] * 1000:10.1f} ms")
+            if result['seconds'] > args.parser_budget:
+                slow.append(result['case'])
+        if slow:
+            print(f"解析超过 {args.parser_budget}s: {', '.join(slow)}")
+        sys.exit(1 if slow else 0)
+
+    if args.keep:
+        for size in sizes:
+            target = Path(args.keep) / f"corpus-{size}"
+            CorpusGenerator(target, seed=args.seed).generate(size)
+            print(f"已生成 {size} 个文件的语料: {target}")
+        return
+
+    results: Dict[str, List[Dict]] = {}
+    for size in sizes:
+        with tempfile.TemporaryDirectory(prefix='docs-benchmark-') as temp_dir:
+            corpus = Path(temp_dir) / 'corpus'
+            print(f"生成 {size} 个文件的语料...")
+            CorpusGenerator(corpus, seed=args.seed).generate(size)
+
+            runs = []
+            for tool in tools:
+                result = run_tool(tool, corpus, Path(temp_dir) / tool, repeat=args.repeat)
+                if result.returncode != 0:
+                    print(f"  {tool:16} 运行失败（退出码 {result.returncode}），不记录吞吐量和内存")
+                else:
+                    print(f"  {tool:16} {result.seconds:8.2f}s {result.files_per_sec:10.1f} 文件/秒 "
+                          f"{result.peak_memory_kb / 1024:8.1f} MB")
+                runs.append(asdict(result))
+            results[str(size)] = runs
+
+    report = {
+        'timestamp': datetime.now().isoformat(),
+        'python': sys.version.split()[0],
+        'seed': args.seed,
+        'results': results
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"基准结果已保存到 {args.output}")
+
+    if args.save_baseline:
+        shutil.copyfile(args.output, args.baseline)
+        print(f"已保存为基线 {args.baseline}")
+        return
+
+    try:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+    except FileNotFoundError:
+        print(f"未找到基线 {args.baseline}，使用 --save-baseline 保存")
+        return
+
+    regressions = find_regressions(results, baseline, args.tolerance)
+    if regressions:
+        print(f"发现 {len(regressions)} 处性能回退（容差 {args.tolerance:.0%}）:")
+        for regression in regressions:
+            print(f"  - {regression}")
+    else:
+        print("没有发现性能回退")
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
@@ -7,9 +7,29 @@ ZephyrUI 文档格式统一化工具
 import os
 import re
 from pathlib import Path
-from typing import List, Dict
+from typing import Iterable, Iterator, List, Dict, Optional, Set, TextIO, Tuple
 import json
 
+from markdown_document import MarkdownDocument
+from markdown_links import FENCE_PATTERN, FenceTracker
+
+# [文本] (链接) -> [文本](链接)
+LINK_SPACING_PATTERN = re.compile(r'\[([^\]]+)\]\s+\(([^)]+)\)')
+# [文本](./链接) -> [文本](链接)
+CURRENT_DIR_LINK_PATTERN = re.compile(r'\[([^\]]+)\]\(\./([^)]+)\)')
+USAGE_SECTION = "## 🚀 基础用法"
+STYLE_SECTION = "## 🎨 样式定制"
+# 质量检查 --fix 应用的规则类别；链接写法留给格式化工具统一处理
+FIX_RULES = {'headings', 'code_blocks', 'tables', 'frontmatter', 'structure'}
+
+def iter_file_lines(f: TextIO) -> Iterator[str]:
+    """逐行读取文件并去掉换行符，与 content.split('\\n') 的结果一致（以换行结尾时最后多一个空行）"""
+    line = ''
+    for line in f:
+        yield line[:-1] if line.endswith('\n') else line
+    if not line or line.endswith('\n'):
+        yield ''
+
 class DocsFormatter:
     def __init__(self, docs_dir: str = "doc"):
         self.docs_dir = Path(docs_dir)
@@ -20,79 +40,20 @@ class DocsFormatter:
             'fixed_headings': 0,
             'fixed_code_blocks': 0,
             'fixed_tables': 0,
-            'fixed_links': 0
+            'fixed_links': 0,
+            'added_frontmatter': 0,
+            'fixed_structure': 0
         }
     
     def find_markdown_files(self) -> List[Path]:
         """查找所有Markdown文件"""
         return list(self.docs_dir.rglob("*.md"))
     
-    def format_headings(self, content: str) -> str:
-        """统一标题格式"""
-        lines = content.split('\n')
-        formatted_lines = []
-        
-        for i, line in enumerate(lines):
-            # 处理标题格式
-            if line.startswith('#'):
-                # 确保标题前后有空行
-                if i > 0 and lines[i-1].strip() != '':
-                    formatted_lines.append('')
-                formatted_lines.append(line)
-                if i < len(lines) - 1 and lines[i+1].strip() != '':
-                    formatted_lines.append('')
-            else:
-                formatted_lines.append(line)
-        
-        return '\n'.join(formatted_lines)
-    
-    def format_code_blocks(self, content: str) -> str:
-        """统一代码块格式"""
-        # 确保代码块前后有空行
-        formatted_content = re.sub(r'(\n```\w*\n)', r'\n\1', content)
-        formatted_content = re.sub(r'(\n```\n)', r'\1\n', formatted_content)
-        
-        # 添加语言标识
-        formatted_content = re.sub(r'(\n)```([^`\n]*)\n', r'\1```dart\n', formatted_content)
-        
-        return formatted_content
-    
-    def format_tables(self, content: str) -> str:
-        """统一表格格式"""
-        lines = content.split('\n')
-        formatted_lines = []
-        
-        for line in lines:
-            if '|' in line and line.strip().startswith('|'):
-                # 格式化表格行
-                cells = [cell.strip() for cell in line.split('|')]
-                if len(cells) > 2:  # 确保是表格行
-                    formatted_line = '| ' + ' | '.join(cells[1:-1]) + ' |'
-                    formatted_lines.append(formatted_line)
-                else:
-                    formatted_lines.append(line)
-            else:
-                formatted_lines.append(line)
-        
-        return '\n'.join(formatted_lines)
-    
-    def format_links(self, content: str) -> str:
-        """统一链接格式"""
-        # 确保链接格式正确
-        formatted_content = re.sub(r'\[([^\]]+)\]\s*\(([^)]+)\)', r'[\1](\2)', content)
-        
-        # 统一内部链接格式
-        formatted_content = re.sub(r'\[([^\]]+)\]\(\.\./([^)]+)\)', r'[\1](../\2)', formatted_content)
-        formatted_content = re.sub(r'\[([^\]]+)\]\(\./([^)]+)\)', r'[\1](\2)', formatted_content)
-        
-        return formatted_content
-    
-    def add_frontmatter(self, content: str, file_path: Path) -> str:
-        """添加统一的frontmatter"""
-        # 获取文件标题
+    def build_frontmatter(self, file_path: Path) -> str:
+        """生成统一的frontmatter（包含结尾的空行）"""
         title = file_path.stem.replace('-', ' ').replace('_', ' ').title()
         
-        frontmatter = f"""---
+        return f"""---
 title: {title}
 description: ZephyrUI {title} 组件文档
 version: 1.0.0
@@ -100,61 +61,127 @@ last_updated: 2024-08-25
 ---
 
 """
-        
-        # 如果文件已经有frontmatter，不重复添加
-        if content.startswith('---'):
-            return content
-        
-        return frontmatter + content
     
-    def standardize_structure(self, content: str) -> str:
-        """标准化文档结构"""
-        lines = content.split('\n')
-        
-        # 确保有标题
-        if not lines[0].startswith('# '):
-            lines.insert(0, f"# {Path(self.current_file).stem.replace('-', ' ').title()}")
-        
-        # 添加标准章节
-        standard_sections = [
-            "## 🎯 组件概述",
-            "## 🚀 基础用法",
-            "## 🎨 样式定制",
-            "## 🎛️ API 参考",
-            "## 🏆 最佳实践",
-            "## 🔄 相关组件",
-            "## 📝 更新日志"
-        ]
+    def format_lines(self, lines: Iterable[str], file_path: Path,
+                     rules: Optional[Set[str]] = None) -> Tuple[List[str], Dict[str, int]]:
+        """逐行扫描一次，同时应用所有格式化规则，返回格式化后的行和各类修复的数量
+        
+        规则：补全 frontmatter 和一级标题；标题、代码块前后保留空行；开启围栏缺少语言时补 dart；
+        统一表格行和链接写法；有“基础用法”但缺少“样式定制”章节时在末尾补上。
+        代码块内的行原样保留，不会被当作标题、表格或链接处理。
+        rules 为修复类别（与返回的计数同名）的子集时只应用这些类别的规则，None 表示全部
+        """
+        counts = {'headings': 0, 'code_blocks': 0, 'tables': 0, 'links': 0, 'frontmatter': 0, 'structure': 0}
+        enabled = set(counts) if rules is None else rules
+        output: List[str] = []
+        fences = FenceTracker()
+        in_frontmatter = False
+        has_title = False
+        prev_blank = True
+        # 上一行是标题或闭合围栏时，下一行非空则先补一个空行；值为计数的类别
+        pending_blank: Optional[str] = None
+        sections = set()
+        
+        for line_num, line in enumerate(lines, 1):
+            if '## ' in line:
+                sections.update(section for section in (USAGE_SECTION, STYLE_SECTION) if section in line)
+            
+            if line_num == 1:
+                if line.startswith('---'):
+                    in_frontmatter = True
+                    output.append(line)
+                    continue
+                if 'frontmatter' in enabled:
+                    output.extend(self.build_frontmatter(file_path).split('\n')[:-1])
+                    counts['frontmatter'] += 1
+            elif in_frontmatter:
+                output.append(line)
+                if line.startswith('---'):
+                    in_frontmatter = False
+                    prev_blank = False
+                continue
+            
+            was_in_code = fences.in_code
+            if not was_in_code and line.strip():
+                if pending_blank in enabled:
+                    output.append('')
+                    counts[pending_blank] += 1
+                    prev_blank = True
+                
+                if not has_title:
+                    # 正文第一行必须是一级标题
+                    has_title = True
+                    if not line.startswith('# ') and 'structure' in enabled:
+                        if not prev_blank:
+                            output.append('')
+                        output.extend([f"# {file_path.stem.replace('-', ' ').title()}", ''])
+                        counts['structure'] += 1
+                        prev_blank = True
+            if not was_in_code:
+                pending_blank = None
+            
+            if fences.update(line):
+                if not was_in_code and 'code_blocks' in enabled:
+                    if not prev_blank:
+                        output.append('')
+                        counts['code_blocks'] += 1
+                    match = FENCE_PATTERN.match(line)
+                    if not line[match.end():].strip():
+                        line = line[:match.end()] + 'dart'
+                        counts['code_blocks'] += 1
+                elif was_in_code and not fences.in_code:
+                    pending_blank = 'code_blocks'
+                output.append(line)
+                prev_blank = False
+                continue
+            
+            if line.startswith('#'):
+                if not prev_blank and 'headings' in enabled:
+                    output.append('')
+                    counts['headings'] += 1
+                pending_blank = 'headings'
+            elif line.strip().startswith('|') and 'tables' in enabled:
+                cells = [cell.strip() for cell in line.split('|')]
+                if len(cells) > 2:
+                    formatted_line = '| ' + ' | '.join(cells[1:-1]) + ' |'
+                    if formatted_line != line:
+                        line = formatted_line
+                        counts['tables'] += 1
+            
+            if ('](' in line or '] (' in line) and 'links' in enabled:
+                formatted_line = LINK_SPACING_PATTERN.sub(r'[\1](\2)', line)
+                formatted_line = CURRENT_DIR_LINK_PATTERN.sub(r'[\1](\2)', formatted_line)
+                if formatted_line != line:
+                    line = formatted_line
+                    counts['links'] += 1
+            
+            output.append(line)
+            prev_blank = not line.strip()
         
-        # 检查是否需要添加标准章节
-        for section in standard_sections:
-            if section not in content:
-                # 在适当位置添加章节
-                if "## 🚀 基础用法" in content and section == "## 🎨 样式定制":
-                    lines.append(f"\n{section}\n")
+        if (USAGE_SECTION in sections and STYLE_SECTION not in sections and not fences.in_code
+                and 'structure' in enabled):
+            if not prev_blank:
+                output.append('')
+            output.extend([STYLE_SECTION, ''])
+            counts['structure'] += 1
         
-        return '\n'.join(lines)
+        return output, counts
+    
+    def fix_document(self, doc: MarkdownDocument, file_path: Path) -> Tuple[str, Dict[str, int]]:
+        """按 FIX_RULES 中的规则格式化已解析文档的行，返回修复后的内容和各类修复的数量"""
+        lines, counts = self.format_lines(doc.lines, file_path, FIX_RULES)
+        return '\n'.join(lines), {kind: counts[kind] for kind in FIX_RULES}
     
     def format_file(self, file_path: Path) -> str:
         """格式化单个文件"""
-        self.current_file = file_path
-        
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            original_content = content
+                lines, counts = self.format_lines(iter_file_lines(f), file_path)
             
-            # 应用各种格式化规则
-            content = self.format_headings(content)
-            content = self.format_code_blocks(content)
-            content = self.format_tables(content)
-            content = self.format_links(content)
-            content = self.add_frontmatter(content, file_path)
-            content = self.standardize_structure(content)
+            content = '\n'.join(lines)
             
             # 如果内容有变化，保存文件
-            if content != original_content:
+            if any(counts.values()):
                 with open(file_path, 'w', encoding='utf-8') as f:
                     f.write(content)
                 
@@ -162,14 +189,12 @@ last_updated: 2024-08-25
                 self.formatting_stats['formatted_files'] += 1
                 
                 # 更新统计信息
-                if self.format_headings.__name__ in str(self.format_headings):
-                    self.formatting_stats['fixed_headings'] += 1
-                if self.format_code_blocks.__name__ in str(self.format_code_blocks):
-                    self.formatting_stats['fixed_code_blocks'] += 1
-                if self.format_tables.__name__ in str(self.format_tables):
-                    self.formatting_stats['fixed_tables'] += 1
-                if self.format_links.__name__ in str(self.format_links):
-                    self.formatting_stats['fixed_links'] += 1
+                self.formatting_stats['fixed_headings'] += counts['headings']
+                self.formatting_stats['fixed_code_blocks'] += counts['code_blocks']
+                self.formatting_stats['fixed_tables'] += counts['tables']
+                self.formatting_stats['fixed_links'] += counts['links']
+                self.formatting_stats['added_frontmatter'] += counts['frontmatter']
+                self.formatting_stats['fixed_structure'] += counts['structure']
             
             return content
             
@@ -203,6 +228,8 @@ last_updated: 2024-08-25
         print(f"修复代码块数: {self.formatting_stats['fixed_code_blocks']}")
         print(f"修复表格数: {self.formatting_stats['fixed_tables']}")
         print(f"修复链接数: {self.formatting_stats['fixed_links']}")
+        print(f"添加frontmatter数: {self.formatting_stats['added_frontmatter']}")
+        print(f"补全结构数: {self.formatting_stats['fixed_structure']}")
 
 def main():
     """主函数"""
@@ -7,20 +7,41 @@ ZephyrUI 文档质量检查工具
 import os
 import re
 import json
+import argparse
+import hashlib
+import importlib.util
+import inspect
+import mmap
+import sqlite3
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional
-from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Set, Tuple, Optional
+from dataclasses import dataclass, asdict, field, replace
 from datetime import datetime
 
+from json_cache import JsonLruCache, write_file_atomic
+from markdown_document import MarkdownDocument
+from ndjson_report import NdjsonReportWriter
+
 @dataclass
 class DocIssue:
-    """文档问题"""
+    """文档问题（使用 __slots__，路径、类型和严重程度字符串驻留共享）"""
+    __slots__ = ('file_path', 'line_number', 'issue_type', 'severity', 'message', 'suggestion')
     file_path: str
     line_number: int
     issue_type: str
     severity: str
     message: str
     suggestion: str
+    
+    def __post_init__(self):
+        # 大量问题共用少数几种取值，驻留后每种取值只保存一份
+        self.file_path = sys.intern(self.file_path)
+        self.issue_type = sys.intern(self.issue_type)
+        self.severity = sys.intern(self.severity)
 
 @dataclass
 class DocQualityScore:
@@ -31,13 +52,400 @@ class DocQualityScore:
     format_score: float
     structure_score: float
     issues: List[DocIssue]
+    fixes: Dict[str, int] = field(default_factory=dict)  # --fix 模式下写回文件的各类修复数量
+
+class QualityStats:
+    """质量报告的汇总计数器，每加入一个文件评分就增量更新"""
+    
+    def __init__(self):
+        self.total_files = 0
+        self.files_with_issues = 0
+        self.total_issues = 0
+        self.score_sum = 0.0
+        self.severity_counts: Dict[str, int] = {}
+        self.type_counts: Dict[str, int] = {}
+    
+    def add(self, score: 'DocQualityScore'):
+        """加入一个文件的评分和问题"""
+        self.total_files += 1
+        self.score_sum += score.total_score
+        if score.issues:
+            self.files_with_issues += 1
+        self.total_issues += len(score.issues)
+        for issue in score.issues:
+            self.severity_counts[issue.severity] = self.severity_counts.get(issue.severity, 0) + 1
+            self.type_counts[issue.issue_type] = self.type_counts.get(issue.issue_type, 0) + 1
+    
+    def remove(self, score: 'DocQualityScore'):
+        """移除之前加入的评分（监视模式下文件被修改或删除时）"""
+        self.total_files -= 1
+        self.score_sum -= score.total_score
+        if score.issues:
+            self.files_with_issues -= 1
+        self.total_issues -= len(score.issues)
+        for counts, key in [(self.severity_counts, 'severity'), (self.type_counts, 'issue_type')]:
+            for issue in score.issues:
+                value = getattr(issue, key)
+                counts[value] -= 1
+                if not counts[value]:
+                    del counts[value]
+    
+    @property
+    def average_score(self) -> float:
+        return self.score_sum / self.total_files if self.total_files else 0
+
+@dataclass
+class QualityRule:
+    """质量检查规则
+    
+    类别分数 = 100 + Σ(规则权重 × 规则分数)，上限 100。大多数规则以 100 为满分，
+    只扣分的规则（如文件大小）没有问题时返回 0，有问题时返回负的扣分值
+    """
+    rule_id: str
+    category: str  # content / format / structure
+    check: str  # DocsQualityChecker 上的方法名，返回 (分数, 问题列表)
+    weight: float
+    severity: Optional[str] = None  # 设置后覆盖该规则产出问题的严重程度
+    enabled: bool = True
+    line_scoped: bool = False  # 问题只与具体行有关，可以只检查改动的行
+
+DEFAULT_RULES = [
+    QualityRule('frontmatter', 'content', 'check_frontmatter', 0.2),
+    QualityRule('required_sections', 'content', 'check_required_sections', 0.3),
+    QualityRule('code_examples', 'content', 'check_code_examples', 0.3),
+    QualityRule('description', 'content', 'check_description_quality', 0.2),
+    QualityRule('line_length', 'format', 'check_line_length', 0.3, line_scoped=True),
+    QualityRule('heading_format', 'format', 'check_heading_format', 0.3, line_scoped=True),
+    QualityRule('table_format', 'format', 'check_table_format', 0.2, line_scoped=True),
+    QualityRule('link_format', 'format', 'check_link_format', 0.2, line_scoped=True),
+    QualityRule('file_size', 'structure', 'check_file_size', 1.0),
+    QualityRule('section_count', 'structure', 'check_section_count', 1.0),
+    QualityRule('logical_order', 'structure', 'check_logical_order', 0.3)
+]
+
+RULE_CATEGORIES = ('content', 'format', 'structure')
+SEVERITIES = ('critical', 'major', 'minor')
+# 规则配置中允许覆盖的字段及其类型
+RULE_OVERRIDE_TYPES = {'weight': (int, float), 'severity': str, 'enabled': bool}
+
+def load_rule_config(config_file: str) -> List[QualityRule]:
+    """从 JSON 文件加载规则配置
+    
+    格式: {"rules": {"line_length": {"enabled": false}, "heading_format": {"weight": 0.1, "severity": "major"}}}
+    未出现的规则使用默认配置；未知的规则或配置项、类型错误和无效的 severity 抛出 ValueError
+    """
+    with open(config_file, 'r', encoding='utf-8') as f:
+        overrides = json.load(f).get('rules', {})
+    
+    known = {rule.rule_id for rule in DEFAULT_RULES}
+    for rule_id, override in overrides.items():
+        if rule_id not in known:
+            raise ValueError(f"未知的规则: {rule_id}")
+        if not isinstance(override, dict):
+            raise ValueError(f"规则 {rule_id} 的配置必须是对象")
+        for key, value in override.items():
+            expected = RULE_OVERRIDE_TYPES.get(key)
+            if expected is None:
+                raise ValueError(f"规则 {rule_id} 的未知配置项: {key}（可选: {', '.join(RULE_OVERRIDE_TYPES)}）")
+            # bool 是 int 的子类，不能当作权重
+            if not isinstance(value, expected) or (key == 'weight' and isinstance(value, bool)):
+                raise ValueError(f"规则 {rule_id} 的 {key} 类型错误: {value!r}")
+        if 'severity' in override and override['severity'] not in SEVERITIES:
+            raise ValueError(f"规则 {rule_id} 的 severity 无效: {override['severity']}（可选: {', '.join(SEVERITIES)}）")
+    
+    rules = []
+    for rule in DEFAULT_RULES:
+        override = overrides.get(rule.rule_id, {})
+        rules.append(replace(rule, **{key: override[key] for key in ('weight', 'severity', 'enabled') if key in override}))
+    return rules
+
+HUNK_PATTERN = re.compile(r'^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@')
+
+def git_changed_lines(base: str, paths: List[str]) -> Dict[str, Set[int]]:
+    """用本地 git diff 计算相对 base 改动（新增或修改）的行号，路径相对当前目录
+    
+    与 base 和 HEAD 的合并基点比较（包括未提交的改动），base 上之后的提交不算作改动；
+    diff 在仓库根目录运行，当前目录之外的文件也不会被漏掉
+    """
+    toplevel = subprocess.run(['git', 'rev-parse', '--show-toplevel'],
+                              check=True, capture_output=True, text=True).stdout.strip()
+    
+    def git(*command: str) -> str:
+        return subprocess.run(['git', *command], check=True, capture_output=True, text=True,
+                              encoding='utf-8', cwd=toplevel).stdout
+    
+    merge_base = git('merge-base', base, 'HEAD').strip()
+    pathspecs = [os.path.relpath(os.path.realpath(path), toplevel) for path in paths]
+    output = git('-c', 'core.quotePath=false', 'diff', '--unified=0', '--no-color', '--no-ext-diff',
+                 '--diff-filter=AMR', merge_base, '--', *pathspecs)
+    
+    changed: Dict[str, Set[int]] = {}
+    current: Optional[Set[int]] = None
+    for line in output.splitlines():
+        if line.startswith('+++ '):
+            target = line[4:]
+            if target.startswith('b/'):
+                path = os.path.relpath(os.path.join(toplevel, target[2:]), os.path.realpath(os.getcwd()))
+                current = changed.setdefault(path, set())
+            else:
+                current = None
+        elif line.startswith('@@') and current is not None:
+            match = HUNK_PATTERN.match(line)
+            if match:
+                start = int(match.group(1))
+                count = int(match.group(2)) if match.group(2) is not None else 1
+                current.update(range(start, start + count))
+    return {path: lines for path, lines in changed.items() if lines}
+
+def load_formatter(docs_dir: str):
+    """加载同目录下的 docs-formatter.py（文件名含连字符，不能直接 import）"""
+    spec = importlib.util.spec_from_file_location('docs_formatter', Path(__file__).parent / 'docs-formatter.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.DocsFormatter(docs_dir)
+
+def git_resolve_commit(ref: str) -> str:
+    """把分支、标签等引用解析为提交哈希"""
+    return subprocess.run(['git', 'rev-parse', '--verify', f'{ref}^{{commit}}'],
+                          check=True, capture_output=True, text=True).stdout.strip()
+
+def git_is_dirty(paths: List[str]) -> bool:
+    """工作区中指定路径是否有未提交的改动"""
+    return bool(subprocess.run(['git', 'status', '--porcelain', '--', *paths],
+                               check=True, capture_output=True, text=True).stdout.strip())
+
+class QualityHistory:
+    """SQLite 质量评分历史，按提交记录每次运行的逐文件评分，支持趋势和退化查询"""
+    
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS runs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        commit_hash TEXT NOT NULL,
+        dirty INTEGER NOT NULL,
+        created_at REAL NOT NULL,
+        total_files INTEGER,
+        total_issues INTEGER,
+        average_score REAL
+    );
+    CREATE TABLE IF NOT EXISTS file_scores (
+        run_id INTEGER NOT NULL,
+        file_path TEXT NOT NULL,
+        total_score REAL NOT NULL,
+        content_score REAL NOT NULL,
+        format_score REAL NOT NULL,
+        structure_score REAL NOT NULL,
+        issue_count INTEGER NOT NULL,
+        PRIMARY KEY (run_id, file_path)
+    );
+    CREATE INDEX IF NOT EXISTS idx_runs_commit ON runs(commit_hash, id);
+    CREATE INDEX IF NOT EXISTS idx_file_scores_path ON file_scores(file_path, run_id);
+    """
+    
+    def __init__(self, db_file: str):
+        self.db_file = db_file
+        self.conn = sqlite3.connect(db_file)
+        self.conn.executescript(self.SCHEMA)
+        self.run_id: Optional[int] = None
+    
+    def start_run(self, commit_hash: str, dirty: bool) -> int:
+        """开始记录一次运行"""
+        cursor = self.conn.execute("INSERT INTO runs (commit_hash, dirty, created_at) VALUES (?, ?, ?)",
+                                   (commit_hash, int(dirty), time.time()))
+        self.run_id = cursor.lastrowid
+        return self.run_id
+    
+    def add_score(self, score: 'DocQualityScore'):
+        """记录单个文件的评分"""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO file_scores (run_id, file_path, total_score, content_score, format_score, "
+            "structure_score, issue_count) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (self.run_id, score.file_path, score.total_score, score.content_score, score.format_score,
+             score.structure_score, len(score.issues)))
+    
+    def finish_run(self):
+        """汇总本次运行并提交"""
+        self.conn.execute(
+            "UPDATE runs SET total_files = (SELECT COUNT(*) FROM file_scores WHERE run_id = :id),"
+            " total_issues = (SELECT SUM(issue_count) FROM file_scores WHERE run_id = :id),"
+            " average_score = (SELECT AVG(total_score) FROM file_scores WHERE run_id = :id) WHERE id = :id",
+            {'id': self.run_id})
+        self.conn.commit()
+    
+    def close(self):
+        """关闭数据库连接"""
+        self.conn.close()
+    
+    def latest_run(self, commit_hash: Optional[str] = None) -> Optional[int]:
+        """最近一次运行（可限定提交）"""
+        if commit_hash is None:
+            row = self.conn.execute("SELECT MAX(id) FROM runs").fetchone()
+        else:
+            row = self.conn.execute("SELECT MAX(id) FROM runs WHERE commit_hash = ?", (commit_hash,)).fetchone()
+        return row[0]
+    
+    def regressions(self, base_run: int, run_id: int) -> List[Tuple]:
+        """两次运行之间评分下降的文件，按下降幅度排序"""
+        return self.conn.execute(
+            "SELECT cur.file_path, old.total_score, cur.total_score, cur.total_score - old.total_score AS delta "
+            "FROM file_scores cur JOIN file_scores old ON old.file_path = cur.file_path AND old.run_id = ? "
+            "WHERE cur.run_id = ? AND cur.total_score < old.total_score ORDER BY delta, cur.file_path",
+            (base_run, run_id)).fetchall()
+    
+    def trend(self, file_path: str) -> List[Tuple]:
+        """单个文件在各次运行中的评分"""
+        return self.conn.execute(
+            "SELECT r.commit_hash, r.dirty, r.created_at, f.total_score, f.issue_count "
+            "FROM file_scores f JOIN runs r ON r.id = f.run_id WHERE f.file_path = ? ORDER BY r.id",
+            (file_path,)).fetchall()
+    
+    def runs(self, limit: int = 20) -> List[Tuple]:
+        """最近的运行记录"""
+        return self.conn.execute(
+            "SELECT id, commit_hash, dirty, created_at, total_files, total_issues, average_score "
+            "FROM runs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+
+# 所有规则共用的解析模块，源码变化时全部缓存失效
+PARSER_SOURCES = ('markdown_document.py', 'markdown_links.py')
+
+def _parser_source_hash() -> str:
+    digest = hashlib.sha1()
+    for name in PARSER_SOURCES:
+        try:
+            digest.update((Path(__file__).parent / name).read_bytes())
+        except OSError:
+            pass
+    return digest.hexdigest()
+
+class QualityResultCache(JsonLruCache):
+    """按文件内容哈希缓存各类别的评分和问题（LRU）
+    
+    条目格式: 内容哈希 -> {类别: {'rules': 规则哈希, 'score': 分数, 'issues': [问题]}}
+    每个类别单独记录规则哈希，修改某一类规则只会让该类别重新计算
+    """
+    
+    def __init__(self, cache_file: Optional[str] = ".quality-cache.json", max_entries: int = 5000):
+        super().__init__(cache_file, max_entries)
+        self.hits = 0
+        self.partial = 0
+        self.misses = 0
+
+class DocsWatcher:
+    """轮询文档目录中 Markdown 文件的 mtime
+    
+    目录的 mtime 只在增删、重命名条目时变化，所以目录列表按 mtime 缓存，
+    每次轮询只重新列出发生变化的目录，其余文件只需一次 stat
+    """
+    
+    def __init__(self, root: Path):
+        self.root = str(root)
+        # 目录 -> (mtime_ns, 子目录, Markdown 文件)
+        self.dirs: Dict[str, Tuple[int, List[str], List[str]]] = {}
+        # 文件 -> (mtime_ns, 大小)
+        self.files: Dict[str, Tuple[int, int]] = {}
+    
+    def list_dir(self, path: str) -> Optional[Tuple[List[str], List[str]]]:
+        """列出目录，必要时重新扫描"""
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        cached = self.dirs.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1], cached[2]
+        
+        subdirs, markdown_files = [], []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    # 与 rglob 一致，不进入指向目录的符号链接，避免 loop -> .. 之类的循环
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif entry.name.endswith('.md') and entry.is_file():
+                        markdown_files.append(entry.path)
+        except OSError:
+            return None
+        self.dirs[path] = (mtime, subdirs, markdown_files)
+        return subdirs, markdown_files
+    
+    def poll(self) -> Tuple[List[str], List[str], List[str]]:
+        """返回自上次轮询以来新增、修改和删除的文件"""
+        seen: Dict[str, Tuple[int, int]] = {}
+        visited: Set[str] = set()
+        pending = [self.root]
+        while pending:
+            path = pending.pop()
+            if path in visited:
+                continue
+            visited.add(path)
+            listing = self.list_dir(path)
+            if listing is None:
+                continue
+            subdirs, markdown_files = listing
+            pending.extend(subdirs)
+            for file_path in markdown_files:
+                try:
+                    stat = os.stat(file_path)
+                except OSError:
+                    continue
+                seen[file_path] = (stat.st_mtime_ns, stat.st_size)
+        
+        # 已删除的目录不再保留列表
+        for path in [path for path in self.dirs if path not in visited]:
+            del self.dirs[path]
+        
+        added = sorted(path for path in seen if path not in self.files)
+        modified = sorted(path for path, state in seen.items() if path in self.files and self.files[path] != state)
+        removed = sorted(path for path in self.files if path not in seen)
+        self.files = seen
+        return added, modified, removed
+
+# 工作进程内的检查器，由 _init_worker 创建
+_worker_checker: Optional['DocsQualityChecker'] = None
+
+def _init_worker(docs_dir: str, cache_entries: Optional[Dict] = None, rules: Optional[List[QualityRule]] = None,
+                 fix: bool = False):
+    """进程池初始化：每个工作进程创建一个检查器，缓存内容只读"""
+    global _worker_checker
+    cache = None
+    if cache_entries is not None:
+        cache = QualityResultCache(None)
+        cache.entries.update(cache_entries)
+    _worker_checker = DocsQualityChecker(docs_dir, cache=cache, rules=rules, fix=fix)
+
+def _check_file_in_worker(file_path: Path) -> 'CheckResult':
+    """在工作进程中检查单个文件"""
+    return _worker_checker.check_file_cached(file_path)
+
+# 单个文件的检查结果: (评分, 缓存更新 (内容哈希, 条目, 复用的类别数), 规则耗时 {规则: (秒, 问题数)})
+CheckResult = Tuple['DocQualityScore', Optional[Tuple[str, Dict, int]], Dict[str, Tuple[float, int]]]
 
 class DocsQualityChecker:
-    def __init__(self, docs_dir: str = "doc"):
+    def __init__(self, docs_dir: str = "doc", stream: Optional[NdjsonReportWriter] = None, jobs: int = 1,
+                 cache: Optional[QualityResultCache] = None, rules: Optional[List[QualityRule]] = None,
+                 history: Optional[QualityHistory] = None, fix: bool = False, profile: bool = False):
         self.docs_dir = Path(docs_dir)
+        # 大于 1 时使用进程池并行检查
+        self.jobs = jobs
+        self.cache = cache
+        self.history = history
+        # 设置后先在内存中自动修复，再对修复后的内容评分，每个文件最多写一次
+        self.fix = fix
+        self.formatter = load_formatter(docs_dir) if fix else None
+        self.fixed_files: List[str] = []
+        self.fix_counts: Dict[str, int] = {}
+        # 设置后在报告中附带规则耗时统计；耗时每次运行都不同，默认不写入，保证相同输入的报告一致
+        self.profile = profile
+        # 设置后逐条写出结果，不再在内存中保留全部评分和问题
+        self.stream = stream
         self.issues: List[DocIssue] = []
         self.scores: List[DocQualityScore] = []
+        self.stats = QualityStats()
         self.quality_rules = self.load_quality_rules()
+        self.rules = rules if rules is not None else list(DEFAULT_RULES)
+        # 每条规则的累计调用次数、耗时和问题数
+        self.rule_stats: Dict[str, Dict] = {rule.rule_id: {'calls': 0, 'seconds': 0.0, 'issues': 0}
+                                            for rule in self.rules}
+        self.rule_hashes = self.compute_rule_hashes()
         
     def load_quality_rules(self) -> Dict:
         """加载质量检查规则"""
@@ -70,94 +478,178 @@ class DocsQualityChecker:
             }
         }
     
+    def compute_rule_hashes(self) -> Dict[str, str]:
+        """按类别计算规则哈希（规则配置 + 规则方法源码 + 解析模块源码）"""
+        parser_hash = _parser_source_hash()
+        hashes = {}
+        for category in RULE_CATEGORIES:
+            # 规则配置和规则方法源码变化时只让对应类别的缓存失效
+            sources = []
+            for rule in self.category_rules(category):
+                try:
+                    source = inspect.getsource(getattr(type(self), rule.check))
+                except (OSError, TypeError):
+                    source = rule.check
+                sources.append([asdict(rule), source])
+            payload = json.dumps([self.quality_rules[category], sources, parser_hash],
+                                 sort_keys=True, ensure_ascii=False)
+            hashes[category] = hashlib.sha1(payload.encode('utf-8')).hexdigest()
+        return hashes
+    
+    def category_rules(self, category: str) -> List[QualityRule]:
+        """某个类别中启用的规则"""
+        return [rule for rule in self.rules if rule.category == category and rule.enabled]
+    
+    def score_category(self, category: str, doc: MarkdownDocument,
+                       timings: Dict[str, Tuple[float, int]]) -> Tuple[float, List[DocIssue]]:
+        """运行某个类别的所有规则"""
+        return self.run_rules(self.category_rules(category), doc, timings)
+    
+    def run_rules(self, rules: List[QualityRule], doc: MarkdownDocument,
+                  timings: Dict[str, Tuple[float, int]]) -> Tuple[float, List[DocIssue]]:
+        """依次运行规则，记录每条规则的耗时和问题数"""
+        issues = []
+        score = 100.0
+        
+        for rule in rules:
+            start = time.perf_counter()
+            rule_score, rule_issues = getattr(self, rule.check)(doc)
+            timings[rule.rule_id] = (time.perf_counter() - start, len(rule_issues))
+            
+            if rule.severity:
+                for issue in rule_issues:
+                    issue.severity = sys.intern(rule.severity)
+            score += rule_score * rule.weight
+            issues.extend(rule_issues)
+        
+        return min(score, 100), issues
+    
     def find_markdown_files(self) -> List[Path]:
         """查找所有Markdown文件"""
         return list(self.docs_dir.rglob("*.md"))
     
     def check_file_quality(self, file_path: Path) -> DocQualityScore:
         """检查单个文件质量"""
-        issues = []
+        return self.check_file_cached(file_path)[0]
+    
+    def check_file_cached(self, file_path: Path) -> CheckResult:
+        """检查单个文件质量，返回评分、待写入缓存的 (内容哈希, 条目, 复用的类别数) 和规则耗时
         
+        先 stat：超过 max_file_size 的文件（--fix 模式除外）映射到内存，内容哈希直接在映射上计算，
+        缓存命中时完全不解码；需要运行规则时逐行解码，不生成整个文件的字符串
+        """
+        buffer = None
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                lines = content.split('\n')
+            size = os.stat(file_path).st_size
+            if self.formatter is None and size > self.quality_rules['structure']['max_file_size']:
+                with open(file_path, 'rb') as f:
+                    buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    content = f.read()
         except Exception as e:
-            return DocQualityScore(
+            return self.read_error_result(file_path, e)
+        
+        if buffer is not None:
+            try:
+                return self.score_document(file_path, hashlib.sha1(buffer).hexdigest(),
+                                           lambda: MarkdownDocument.parse_buffer(buffer, str(file_path)))
+            except UnicodeDecodeError as e:
+                return self.read_error_result(file_path, e)
+            finally:
+                buffer.close()
+        
+        doc = None
+        fixes: Dict[str, int] = {}
+        if self.formatter is not None:
+            doc = MarkdownDocument.parse(content, str(file_path))
+            fixed_content, counts = self.formatter.fix_document(doc, file_path)
+            if fixed_content != content:
+                try:
+                    write_file_atomic(file_path, fixed_content)
+                except OSError as e:
+                    print(f"写回文件 {file_path} 时出错: {e}")
+                else:
+                    content = fixed_content
+                    fixes = {kind: count for kind, count in counts.items() if count}
+                    # 修复后的内容在评分时重新解析
+                    doc = None
+        
+        return self.score_document(file_path, hashlib.sha1(content.encode('utf-8')).hexdigest(),
+                                   lambda: doc or MarkdownDocument.parse(content, str(file_path)), fixes)
+    
+    def read_error_result(self, file_path: Path, error: Exception) -> CheckResult:
+        """无法读取或解码文件时的检查结果"""
+        return DocQualityScore(
+            file_path=str(file_path),
+            total_score=0,
+            content_score=0,
+            format_score=0,
+            structure_score=0,
+            issues=[DocIssue(
                 file_path=str(file_path),
-                total_score=0,
-                content_score=0,
-                format_score=0,
-                structure_score=0,
-                issues=[DocIssue(
-                    file_path=str(file_path),
-                    line_number=0,
-                    issue_type='file_read_error',
-                    severity='critical',
-                    message=f'无法读取文件: {e}',
-                    suggestion='检查文件权限和编码'
-                )]
-            )
-        
-        # 检查内容质量
-        content_score, content_issues = self.check_content_quality(file_path, content, lines)
-        issues.extend(content_issues)
-        
-        # 检查格式质量
-        format_score, format_issues = self.check_format_quality(file_path, content, lines)
-        issues.extend(format_issues)
-        
-        # 检查结构质量
-        structure_score, structure_issues = self.check_structure_quality(file_path, content, lines)
-        issues.extend(structure_issues)
+                line_number=0,
+                issue_type='file_read_error',
+                severity='critical',
+                message=f'无法读取文件: {error}',
+                suggestion='检查文件权限和编码'
+            )]
+        ), None, {}
+    
+    def score_document(self, file_path: Path, digest: str, parse: Callable[[], MarkdownDocument],
+                       fixes: Optional[Dict[str, int]] = None) -> CheckResult:
+        """按内容哈希复用缓存的类别结果，其余类别在需要时才解析文档并运行规则"""
+        cached = self.cache.get(digest) if self.cache is not None else None
+        doc = None
+        
+        issues = []
+        scores = {}
+        entry = {}
+        reused = 0
+        timings: Dict[str, Tuple[float, int]] = {}
+        # 依次检查内容、格式和结构质量
+        for category in RULE_CATEGORIES:
+            stored = cached.get(category) if cached else None
+            if stored is not None and stored['rules'] == self.rule_hashes[category]:
+                # 缓存中的问题不含路径，相同内容的文件可以共用
+                score = stored['score']
+                category_issues = [DocIssue(file_path=str(file_path), **issue) for issue in stored['issues']]
+                reused += 1
+            else:
+                if doc is None:
+                    # 一次解析，所有规则共享同一个文档模型
+                    doc = parse()
+                score, category_issues = self.score_category(category, doc, timings)
+            
+            scores[category] = score
+            issues.extend(category_issues)
+            entry[category] = {
+                'rules': self.rule_hashes[category],
+                'score': score,
+                'issues': [{k: v for k, v in asdict(issue).items() if k != 'file_path'} for issue in category_issues]
+            }
         
         # 计算总分
-        total_score = (content_score * 0.4 + format_score * 0.3 + structure_score * 0.3)
+        total_score = (scores['content'] * 0.4 + scores['format'] * 0.3 + scores['structure'] * 0.3)
         
         return DocQualityScore(
             file_path=str(file_path),
             total_score=total_score,
-            content_score=content_score,
-            format_score=format_score,
-            structure_score=structure_score,
-            issues=issues
-        )
-    
-    def check_content_quality(self, file_path: Path, content: str, lines: List[str]) -> Tuple[float, List[DocIssue]]:
-        """检查内容质量"""
-        issues = []
-        score = 100.0
-        
-        # 检查frontmatter
-        frontmatter_score, frontmatter_issues = self.check_frontmatter(file_path, content, lines)
-        score += frontmatter_score * 0.2
-        issues.extend(frontmatter_issues)
-        
-        # 检查必需章节
-        sections_score, sections_issues = self.check_required_sections(file_path, content, lines)
-        score += sections_score * 0.3
-        issues.extend(sections_issues)
-        
-        # 检查代码示例
-        code_score, code_issues = self.check_code_examples(file_path, content, lines)
-        score += code_score * 0.3
-        issues.extend(code_issues)
-        
-        # 检查描述质量
-        desc_score, desc_issues = self.check_description_quality(file_path, content, lines)
-        score += desc_score * 0.2
-        issues.extend(desc_issues)
-        
-        return min(score, 100), issues
+            content_score=scores['content'],
+            format_score=scores['format'],
+            structure_score=scores['structure'],
+            issues=issues,
+            fixes=fixes or {}
+        ), (digest, entry, reused), timings
     
-    def check_frontmatter(self, file_path: Path, content: str, lines: List[str]) -> Tuple[float, List[DocIssue]]:
+    def check_frontmatter(self, doc: MarkdownDocument) -> Tuple[float, List[DocIssue]]:
         """检查frontmatter"""
         issues = []
         score = 100.0
         
-        if not content.startswith('---'):
+        if not doc.has_frontmatter:
             issues.append(DocIssue(
-                file_path=str(file_path),
+                file_path=doc.path,
                 line_number=1,
                 issue_type='missing_frontmatter',
                 severity='major',
@@ -167,10 +659,9 @@ class DocsQualityChecker:
             score -= 50
         else:
             # 检查必需属性
-            frontmatter_end = content.find('---', 3)
-            if frontmatter_end == -1:
+            if doc.frontmatter is None:
                 issues.append(DocIssue(
-                    file_path=str(file_path),
+                    file_path=doc.path,
                     line_number=1,
                     issue_type='invalid_frontmatter',
                     severity='major',
@@ -179,13 +670,11 @@ class DocsQualityChecker:
                 ))
                 score -= 30
             else:
-                frontmatter_content = content[3:frontmatter_end]
-                
                 required_props = self.quality_rules['content']['required_properties']
                 for prop in required_props:
-                    if prop not in frontmatter_content:
+                    if prop not in doc.frontmatter:
                         issues.append(DocIssue(
-                            file_path=str(file_path),
+                            file_path=doc.path,
                             line_number=1,
                             issue_type=f'missing_frontmatter_{prop}',
                             severity='minor',
@@ -196,7 +685,7 @@ class DocsQualityChecker:
         
         return score, issues
     
-    def check_required_sections(self, file_path: Path, content: str, lines: List[str]) -> Tuple[float, List[DocIssue]]:
+    def check_required_sections(self, doc: MarkdownDocument) -> Tuple[float, List[DocIssue]]:
         """检查必需章节"""
         issues = []
         score = 100.0
@@ -205,12 +694,12 @@ class DocsQualityChecker:
         missing_sections = []
         
         for section in required_sections:
-            if section not in content:
+            if not any(section in heading.raw for heading in doc.headings):
                 missing_sections.append(section)
         
         if missing_sections:
             issues.append(DocIssue(
-                file_path=str(file_path),
+                file_path=doc.path,
                 line_number=1,
                 issue_type='missing_sections',
                 severity='major',
@@ -221,19 +710,18 @@ class DocsQualityChecker:
         
         return score, issues
     
-    def check_code_examples(self, file_path: Path, content: str, lines: List[str]) -> Tuple[float, List[DocIssue]]:
+    def check_code_examples(self, doc: MarkdownDocument) -> Tuple[float, List[DocIssue]]:
         """检查代码示例"""
         issues = []
         score = 100.0
         
         # 统计代码块数量
-        code_blocks = re.findall(r'```dart\n.*?\n```', content, re.DOTALL)
-        code_count = len(code_blocks)
+        code_count = sum(1 for fence in doc.fences if fence.info == 'dart' and fence.end_line is not None)
         
         min_examples = self.quality_rules['content']['min_code_examples']
         if code_count < min_examples:
             issues.append(DocIssue(
-                file_path=str(file_path),
+                file_path=doc.path,
                 line_number=1,
                 issue_type='insufficient_code_examples',
                 severity='minor',
@@ -243,10 +731,10 @@ class DocsQualityChecker:
             score -= (min_examples - code_count) * 10
         
         # 检查代码块语言标识
-        untagged_blocks = re.findall(r'```\n(.*?)\n```', content, re.DOTALL)
+        untagged_blocks = [fence for fence in doc.fences if not fence.info]
         if untagged_blocks:
             issues.append(DocIssue(
-                file_path=str(file_path),
+                file_path=doc.path,
                 line_number=1,
                 issue_type='untagged_code_blocks',
                 severity='minor',
@@ -257,23 +745,21 @@ class DocsQualityChecker:
         
         return score, issues
     
-    def check_description_quality(self, file_path: Path, content: str, lines: List[str]) -> Tuple[float, List[DocIssue]]:
+    def check_description_quality(self, doc: MarkdownDocument) -> Tuple[float, List[DocIssue]]:
         """检查描述质量"""
         issues = []
         score = 100.0
         
-        # 提取主要描述（frontmatter后的第一段文字）
-        description_match = re.search(r'---\n.*?\n---\n\n(.+?)(?=\n\n#|\n##)', content, re.DOTALL)
-        if description_match:
-            description = description_match.group(1)
-            desc_length = len(description)
+        # 主要描述（frontmatter后的导语），由文档模型线性扫描得到
+        if doc.lead is not None:
+            desc_length = len(doc.lead)
             
             min_length = self.quality_rules['content']['min_description_length']
             max_length = self.quality_rules['content']['max_description_length']
             
             if desc_length < min_length:
                 issues.append(DocIssue(
-                    file_path=str(file_path),
+                    file_path=doc.path,
                     line_number=1,
                     issue_type='short_description',
                     severity='minor',
@@ -284,7 +770,7 @@ class DocsQualityChecker:
             
             if desc_length > max_length:
                 issues.append(DocIssue(
-                    file_path=str(file_path),
+                    file_path=doc.path,
                     line_number=1,
                     issue_type='long_description',
                     severity='minor',
@@ -294,7 +780,7 @@ class DocsQualityChecker:
                 score -= 10
         else:
             issues.append(DocIssue(
-                file_path=str(file_path),
+                file_path=doc.path,
                 line_number=1,
                 issue_type='missing_description',
                 severity='major',
@@ -305,34 +791,7 @@ class DocsQualityChecker:
         
         return score, issues
     
-    def check_format_quality(self, file_path: Path, content: str, lines: List[str]) -> Tuple[float, List[DocIssue]]:
-        """检查格式质量"""
-        issues = []
-        score = 100.0
-        
-        # 检查行长度
-        line_length_score, line_length_issues = self.check_line_length(file_path, lines)
-        score += line_length_score * 0.3
-        issues.extend(line_length_issues)
-        
-        # 检查标题格式
-        heading_score, heading_issues = self.check_heading_format(file_path, lines)
-        score += heading_score * 0.3
-        issues.extend(heading_issues)
-        
-        # 检查表格格式
-        table_score, table_issues = self.check_table_format(file_path, lines)
-        score += table_score * 0.2
-        issues.extend(table_issues)
-        
-        # 检查链接格式
-        link_score, link_issues = self.check_link_format(file_path, lines)
-        score += link_score * 0.2
-        issues.extend(link_issues)
-        
-        return min(score, 100), issues
-    
-    def check_line_length(self, file_path: Path, lines: List[str]) -> Tuple[float, List[DocIssue]]:
+    def check_line_length(self, doc: MarkdownDocument) -> Tuple[float, List[DocIssue]]:
         """检查行长度"""
         issues = []
         score = 100.0
@@ -340,13 +799,13 @@ class DocsQualityChecker:
         max_length = self.quality_rules['format']['max_line_length']
         long_lines = []
         
-        for i, line in enumerate(lines, 1):
-            if len(line) > max_length and not line.startswith('http'):
+        for i, line in enumerate(doc.lines, 1):
+            if len(line) > max_length and not line.startswith('http') and doc.in_scope(i):
                 long_lines.append((i, len(line)))
         
         if long_lines:
             issues.append(DocIssue(
-                file_path=str(file_path),
+                file_path=doc.path,
                 line_number=long_lines[0][0],
                 issue_type='long_lines',
                 severity='minor',
@@ -357,100 +816,102 @@ class DocsQualityChecker:
         
         return score, issues
     
-    def check_heading_format(self, file_path: Path, lines: List[str]) -> Tuple[float, List[DocIssue]]:
+    def check_heading_format(self, doc: MarkdownDocument) -> Tuple[float, List[DocIssue]]:
         """检查标题格式"""
         issues = []
         score = 100.0
         
-        for i, line in enumerate(lines, 1):
-            if line.startswith('#'):
-                # 检查标题前后是否有空行
-                has_blank_before = i == 1 or lines[i-2].strip() == ''
-                has_blank_after = i == len(lines) or lines[i].strip() == ''
+        lines = doc.lines
+        for heading in doc.headings:
+            i = heading.line
+            if not doc.in_scope(i):
+                continue
+            
+            # 检查标题前后是否有空行
+            has_blank_before = i == 1 or lines[i-2].strip() == ''
+            has_blank_after = i == len(lines) or lines[i].strip() == ''
+            
+            if self.quality_rules['format']['heading_blank_lines']:
+                if not has_blank_before:
+                    issues.append(DocIssue(
+                        file_path=doc.path,
+                        line_number=i,
+                        issue_type='heading_format',
+                        severity='minor',
+                        message='标题前缺少空行',
+                        suggestion='在标题前添加空行'
+                    ))
+                    score -= 5
                 
-                if self.quality_rules['format']['heading_blank_lines']:
-                    if not has_blank_before:
-                        issues.append(DocIssue(
-                            file_path=str(file_path),
-                            line_number=i,
-                            issue_type='heading_format',
-                            severity='minor',
-                            message='标题前缺少空行',
-                            suggestion='在标题前添加空行'
-                        ))
-                        score -= 5
-                    
-                    if not has_blank_after:
-                        issues.append(DocIssue(
-                            file_path=str(file_path),
-                            line_number=i,
-                            issue_type='heading_format',
-                            severity='minor',
-                            message='标题后缺少空行',
-                            suggestion='在标题后添加空行'
-                        ))
-                        score -= 5
+                if not has_blank_after:
+                    issues.append(DocIssue(
+                        file_path=doc.path,
+                        line_number=i,
+                        issue_type='heading_format',
+                        severity='minor',
+                        message='标题后缺少空行',
+                        suggestion='在标题后添加空行'
+                    ))
+                    score -= 5
         
         return score, issues
     
-    def check_table_format(self, file_path: Path, lines: List[str]) -> Tuple[float, List[DocIssue]]:
+    def check_table_format(self, doc: MarkdownDocument) -> Tuple[float, List[DocIssue]]:
         """检查表格格式"""
         issues = []
         score = 100.0
         
-        for i, line in enumerate(lines, 1):
-            if '|' in line and line.strip().startswith('|'):
-                # 检查表格格式
-                cells = [cell.strip() for cell in line.split('|')]
-                if len(cells) < 3:  # 至少需要 | 内容 | 
-                    issues.append(DocIssue(
-                        file_path=str(file_path),
-                        line_number=i,
-                        issue_type='table_format',
-                        severity='minor',
-                        message='表格格式不正确',
-                        suggestion='确保表格行格式为 | 单元格1 | 单元格2 |'
-                    ))
-                    score -= 10
+        for row in doc.table_rows:
+            # 检查表格格式
+            if len(row.cells) < 3 and doc.in_scope(row.line):  # 至少需要 | 内容 | 
+                issues.append(DocIssue(
+                    file_path=doc.path,
+                    line_number=row.line,
+                    issue_type='table_format',
+                    severity='minor',
+                    message='表格格式不正确',
+                    suggestion='确保表格行格式为 | 单元格1 | 单元格2 |'
+                ))
+                score -= 10
         
         return score, issues
     
-    def check_link_format(self, file_path: Path, lines: List[str]) -> Tuple[float, List[DocIssue]]:
+    def check_link_format(self, doc: MarkdownDocument) -> Tuple[float, List[DocIssue]]:
         """检查链接格式"""
         issues = []
         score = 100.0
         
-        for i, line in enumerate(lines, 1):
-            # 检查Markdown链接格式
-            markdown_links = re.findall(r'\[([^\]]+)\]\(([^)]+)\)', line)
-            for text, url in markdown_links:
-                if not url.startswith('http') and not url.startswith('#'):
-                    # 检查内部链接
-                    if not url.endswith('.md'):
-                        issues.append(DocIssue(
-                            file_path=str(file_path),
-                            line_number=i,
-                            issue_type='link_format',
-                            severity='minor',
-                            message=f'内部链接格式不正确: {url}',
-                            suggestion='确保内部链接指向.md文件'
-                        ))
-                        score -= 5
+        # 检查Markdown链接格式（跳过代码块和图片）
+        for link in doc.links:
+            if link.kind not in ('inline', 'definition') or not doc.in_scope(link.line):
+                continue
+            url = link.url
+            if not url.startswith('http') and not url.startswith('#'):
+                # 检查内部链接
+                if not url.split('#', 1)[0].endswith('.md'):
+                    issues.append(DocIssue(
+                        file_path=doc.path,
+                        line_number=link.line,
+                        issue_type='link_format',
+                        severity='minor',
+                        message=f'内部链接格式不正确: {url}',
+                        suggestion='确保内部链接指向.md文件'
+                    ))
+                    score -= 5
         
         return score, issues
     
-    def check_structure_quality(self, file_path: Path, content: str, lines: List[str]) -> Tuple[float, List[DocIssue]]:
-        """检查结构质量"""
+    def check_file_size(self, doc: MarkdownDocument) -> Tuple[float, List[DocIssue]]:
+        """检查文件大小（只扣分）"""
         issues = []
-        score = 100.0
+        score = 0.0
         
-        # 检查文件大小
-        file_size = len(content.encode('utf-8'))
+        file_size = doc.size
         max_size = self.quality_rules['structure']['max_file_size']
         
         if file_size > max_size:
             issues.append(DocIssue(
-                file_path=str(file_path),
+                file_path=doc.path,
                 line_number=1,
                 issue_type='large_file',
                 severity='minor',
@@ -459,13 +920,19 @@ class DocsQualityChecker:
             ))
             score -= 20
         
-        # 检查章节数量
-        sections = re.findall(r'^## ', content, re.MULTILINE)
+        return score, issues
+    
+    def check_section_count(self, doc: MarkdownDocument) -> Tuple[float, List[DocIssue]]:
+        """检查章节数量（只扣分）"""
+        issues = []
+        score = 0.0
+        
+        sections = doc.sections(2)
         min_sections = self.quality_rules['structure']['min_sections']
         
         if len(sections) < min_sections:
             issues.append(DocIssue(
-                file_path=str(file_path),
+                file_path=doc.path,
                 line_number=1,
                 issue_type='few_sections',
                 severity='minor',
@@ -474,14 +941,9 @@ class DocsQualityChecker:
             ))
             score -= 15
         
-        # 检查逻辑顺序
-        order_score, order_issues = self.check_logical_order(file_path, content, lines)
-        score += order_score * 0.3
-        issues.extend(order_issues)
-        
-        return min(score, 100), issues
+        return score, issues
     
-    def check_logical_order(self, file_path: Path, content: str, lines: List[str]) -> Tuple[float, List[DocIssue]]:
+    def check_logical_order(self, doc: MarkdownDocument) -> Tuple[float, List[DocIssue]]:
         """检查逻辑顺序"""
         issues = []
         score = 100.0
@@ -497,25 +959,24 @@ class DocsQualityChecker:
             '## 📝 更新日志'
         ]
         
-        # 查找实际章节
-        actual_sections = []
-        for line in lines:
-            if line.startswith('## '):
-                actual_sections.append(line)
+        # 查找实际章节，记录每个章节第一次出现的位置和行号
+        actual_sections: Dict[str, Tuple[int, int]] = {}
+        for index, heading in enumerate(doc.sections(2)):
+            actual_sections.setdefault(heading.raw, (index, heading.line))
         
         # 检查顺序
         for i, expected in enumerate(expected_order):
             if expected in actual_sections:
-                expected_index = actual_sections.index(expected)
+                expected_index, expected_line = actual_sections[expected]
                 
                 # 检查是否有更重要的章节在后面
                 for j in range(i + 1, len(expected_order)):
                     if expected_order[j] in actual_sections:
-                        later_index = actual_sections.index(expected_order[j])
+                        later_index = actual_sections[expected_order[j]][0]
                         if later_index < expected_index:
                             issues.append(DocIssue(
-                                file_path=str(file_path),
-                                line_number=lines.index(expected) + 1,
+                                file_path=doc.path,
+                                line_number=expected_line,
                                 issue_type='logical_order',
                                 severity='minor',
                                 message=f'章节顺序不合理: {expected} 应该在 {expected_order[j]} 之后',
@@ -526,37 +987,268 @@ class DocsQualityChecker:
         
         return score, issues
     
-    def check_all_files(self):
-        """检查所有文件质量"""
+    def iter_file_scores(self, markdown_files: List[Path]) -> Iterator[DocQualityScore]:
+        """按文件顺序产出评分，jobs > 1 时分块交给进程池计算"""
+        for score, update, timings in self.iter_checked_files(markdown_files):
+            self.record_timings(timings)
+            if update is not None and self.cache is not None:
+                digest, entry, reused = update
+                if reused == len(entry):
+                    self.cache.hits += 1
+                elif reused:
+                    self.cache.partial += 1
+                else:
+                    self.cache.misses += 1
+                self.cache.put(digest, entry)
+            yield score
+    
+    def iter_checked_files(self, markdown_files: List[Path]) -> Iterator[CheckResult]:
+        """按文件顺序产出检查结果、缓存更新和规则耗时"""
+        if self.jobs <= 1 or len(markdown_files) <= 1:
+            for file_path in markdown_files:
+                yield self.check_file_cached(file_path)
+            return
+        
+        # 工作进程拿到缓存的只读快照，新结果由主进程统一写回
+        cache_entries = dict(self.cache.entries) if self.cache is not None else None
+        
+        # 每个工作进程大约分到 4 块，兼顾负载均衡和进程间通信开销
+        chunksize = max(1, len(markdown_files) // (self.jobs * 4))
+        with ProcessPoolExecutor(max_workers=self.jobs, initializer=_init_worker,
+                                 initargs=(str(self.docs_dir), cache_entries, self.rules, self.fix)) as executor:
+            # map 按提交顺序返回结果，保证报告与串行运行一致
+            yield from executor.map(_check_file_in_worker, markdown_files, chunksize=chunksize)
+    
+    def check_all_files(self, revision: Optional[Tuple[str, bool]] = None):
+        """检查所有文件质量，revision 为记录评分历史用的 (提交哈希, 工作区是否有改动)"""
         markdown_files = self.find_markdown_files()
         
-        for file_path in markdown_files:
+        if self.history is not None:
+            if revision is None:
+                revision = (git_resolve_commit('HEAD'), git_is_dirty([str(self.docs_dir)]))
+            self.history.start_run(*revision)
+        
+        for file_path, score in zip(markdown_files, self.iter_file_scores(markdown_files)):
             print(f"检查文件: {file_path}")
-            score = self.check_file_quality(file_path)
+            if self.history is not None:
+                self.history.add_score(score)
+            if score.fixes:
+                self.fixed_files.append(score.file_path)
+                for kind, count in score.fixes.items():
+                    self.fix_counts[kind] = self.fix_counts.get(kind, 0) + count
+                if self.stream is not None:
+                    self.stream.emit('fixed', {'file_path': score.file_path, 'fixes': score.fixes})
+            if self.stream is not None:
+                self.emit_score(score)
+                continue
             self.scores.append(score)
             self.issues.extend(score.issues)
+            self.stats.add(score)
+        
+        if self.history is not None:
+            self.history.finish_run()
+            print(f"评分已记录到 {self.history.db_file}")
+        
+        if self.fix:
+            details = ', '.join(f"{kind} {count}" for kind, count in self.fix_counts.items())
+            print(f"自动修复了 {len(self.fixed_files)} 个文件" + (f" ({details})" if details else ""))
+        
+        if self.cache is not None:
+            self.cache.save()
+            print(f"质量检查缓存: 命中 {self.cache.hits}, 部分命中 {self.cache.partial}, 未命中 {self.cache.misses}")
+    
+    def watch(self, interval: float = 0.5):
+        """监视文档目录，只重新评分新增或修改的文件，并增量更新总体评分
+        
+        评分保存在内存中；内容没有变化的保存（只改了 mtime）由内存中的结果缓存命中，不重新运行规则
+        """
+        if self.cache is None:
+            self.cache = QualityResultCache(None)
+        watcher = DocsWatcher(self.docs_dir)
+        scores: Dict[str, DocQualityScore] = {}
+        
+        start = time.perf_counter()
+        markdown_files, _, _ = watcher.poll()
+        for file_path, score in zip(markdown_files, self.iter_file_scores([Path(path) for path in markdown_files])):
+            scores[file_path] = score
+            self.stats.add(score)
+        print(f"已检查 {self.stats.total_files} 个文件，平均质量分 {self.stats.average_score:.1f} "
+              f"({self.get_quality_grade(self.stats.average_score)})，"
+              f"耗时 {(time.perf_counter() - start) * 1000:.0f} ms")
+        print(f"正在监视 {self.docs_dir}（每 {interval} 秒轮询一次，Ctrl+C 退出）...")
+        
+        try:
+            while True:
+                time.sleep(interval)
+                added, modified, removed = watcher.poll()
+                if not (added or modified or removed):
+                    continue
+                
+                start = time.perf_counter()
+                timestamp = datetime.now().strftime('%H:%M:%S')
+                for file_path in removed:
+                    self.stats.remove(scores.pop(file_path))
+                    print(f"[{timestamp}] 删除 {file_path}")
+                
+                changed = added + modified
+                for file_path, score in zip(changed, self.iter_file_scores([Path(path) for path in changed])):
+                    previous = scores.get(file_path)
+                    if previous is not None:
+                        self.stats.remove(previous)
+                    scores[file_path] = score
+                    self.stats.add(score)
+                    
+                    change = f"{previous.total_score:.1f} -> " if previous is not None else ""
+                    print(f"[{timestamp}] {'更新' if previous is not None else '新增'} {file_path}: "
+                          f"{change}{score.total_score:.1f} ({self.get_quality_grade(score.total_score)})，"
+                          f"{len(score.issues)} 个问题")
+                    for issue in score.issues:
+                        print(f"    第 {issue.line_number} 行 [{issue.severity}] {issue.message}")
+                
+                average = self.stats.average_score
+                print(f"[{timestamp}] 全部 {self.stats.total_files} 个文件平均质量分 {average:.1f} "
+                      f"({self.get_quality_grade(average)})，{self.stats.total_issues} 个问题，"
+                      f"耗时 {(time.perf_counter() - start) * 1000:.1f} ms")
+        except KeyboardInterrupt:
+            print("停止监视")
+        finally:
+            self.cache.save()
+    
+    def record_timings(self, timings: Dict[str, Tuple[float, int]]):
+        """累加单个文件的规则耗时和问题数"""
+        for rule_id, (seconds, issue_count) in timings.items():
+            stats = self.rule_stats[rule_id]
+            stats['calls'] += 1
+            stats['seconds'] += seconds
+            stats['issues'] += issue_count
+    
+    def check_changed_lines(self, base: str) -> List[DocIssue]:
+        """只对相对 base 改动的行运行行级规则，不计算评分"""
+        changed = git_changed_lines(base, [str(self.docs_dir)])
+        rules = [rule for rule in self.rules if rule.enabled and rule.line_scoped]
+        
+        issues = []
+        for path, lines in sorted(changed.items()):
+            if not path.endswith('.md'):
+                continue
+            print(f"检查文件: {path} ({len(lines)} 行改动)")
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    content = f.read()
+            except Exception as e:
+                print(f"读取文件 {path} 时出错: {e}")
+                continue
+            
+            doc = MarkdownDocument.parse(content, path)
+            doc.scope = lines
+            timings: Dict[str, Tuple[float, int]] = {}
+            _, file_issues = self.run_rules(rules, doc, timings)
+            self.record_timings(timings)
+            issues.extend(file_issues)
+            if self.stream is not None:
+                for issue in file_issues:
+                    self.stream.emit('issue', asdict(issue), breakdown=('severity', 'issue_type'))
+        
+        return issues
+    
+    def generate_diff_report(self, base: str, issues: List[DocIssue]):
+        """输出改动行上的问题"""
+        for issue in issues:
+            print(f"{issue.file_path}:{issue.line_number}: [{issue.severity}] {issue.message}")
+        
+        if self.stream is not None:
+            self.stream.summary({'base': base, 'total_issues': len(issues),
+                                 'issue_type_breakdown': self.stream.breakdown('issue', 'issue_type'),
+                                 **self.rule_stats_section()})
+        print(f"相对 {base} 改动的行上发现 {len(issues)} 个问题")
+    
+    def rule_stats_report(self) -> List[Dict]:
+        """按累计耗时从高到低排列的规则统计"""
+        rules = {rule.rule_id: rule for rule in self.rules}
+        report = []
+        for rule_id, stats in self.rule_stats.items():
+            rule = rules[rule_id]
+            report.append({
+                'rule_id': rule_id,
+                'category': rule.category,
+                'weight': rule.weight,
+                'enabled': rule.enabled,
+                'calls': stats['calls'],
+                'seconds': round(stats['seconds'], 6),
+                'issues': stats['issues']
+            })
+        report.sort(key=lambda item: item['seconds'], reverse=True)
+        return report
+    
+    def rule_stats_section(self) -> Dict[str, List[Dict]]:
+        """报告中的规则统计部分，只在 --profile 时输出"""
+        return {'rule_stats': self.rule_stats_report()} if self.profile else {}
+    
+    def print_rule_stats(self):
+        """打印每条规则的耗时和问题数"""
+        print("规则耗时 (毫秒 / 调用次数 / 问题数):")
+        for item in self.rule_stats_report():
+            if not item['enabled']:
+                print(f"  {item['rule_id']}: 已禁用")
+                continue
+            print(f"  {item['rule_id']}: {item['seconds'] * 1000:.1f} / {item['calls']} / {item['issues']}")
+    
+    def emit_score(self, score: DocQualityScore):
+        """流式写出单个文件的评分和问题"""
+        self.stream.emit('file', {
+            'file_path': score.file_path,
+            'total_score': score.total_score,
+            'content_score': score.content_score,
+            'format_score': score.format_score,
+            'structure_score': score.structure_score,
+            'issue_count': len(score.issues),
+            'has_issues': bool(score.issues)
+        }, totals=('total_score', 'has_issues'))
+        for issue in score.issues:
+            self.stream.emit('issue', asdict(issue), breakdown=('severity', 'issue_type'))
+    
+    def generate_stream_summary(self):
+        """根据流式输出的计数器生成汇总记录"""
+        stream = self.stream
+        total_files = stream.counts['file']
+        total_issues = stream.counts['issue']
+        files_with_issues = int(stream.total('file', 'has_issues'))
+        avg_score = stream.total('file', 'total_score') / total_files if total_files else 0
+        
+        stream.summary({
+            'total_files': total_files,
+            'files_with_issues': files_with_issues,
+            'total_issues': total_issues,
+            'average_score': avg_score,
+            'quality_grade': self.get_quality_grade(avg_score),
+            'severity_breakdown': stream.breakdown('issue', 'severity'),
+            'issue_type_breakdown': stream.breakdown('issue', 'issue_type'),
+            'recommendations': self.generate_recommendations(stream.breakdown('issue', 'issue_type')),
+            **self.rule_stats_section()
+        })
+        
+        print(f"质量检查完成!")
+        print(f"总文件数: {total_files}")
+        print(f"有问题的文件: {files_with_issues}")
+        print(f"总问题数: {total_issues}")
+        print(f"平均质量分: {avg_score:.1f}")
+        print(f"质量等级: {self.get_quality_grade(avg_score)}")
+        print(f"流式报告已写入 {stream.path}")
     
     def generate_quality_report(self):
         """生成质量报告"""
-        # 统计信息
-        total_files = len(self.scores)
-        files_with_issues = len([s for s in self.scores if s.issues])
-        total_issues = len(self.issues)
-        
-        # 按严重程度统计
-        severity_counts = {}
-        for issue in self.issues:
-            severity = issue.severity
-            severity_counts[severity] = severity_counts.get(severity, 0) + 1
-        
-        # 按问题类型统计
-        type_counts = {}
-        for issue in self.issues:
-            issue_type = issue.issue_type
-            type_counts[issue_type] = type_counts.get(issue_type, 0) + 1
+        # 统计信息（检查过程中已增量汇总）
+        stats = self.stats
+        total_files = stats.total_files
+        files_with_issues = stats.files_with_issues
+        total_issues = stats.total_issues
+        
+        # 按严重程度和问题类型统计
+        severity_counts = dict(stats.severity_counts)
+        type_counts = dict(stats.type_counts)
         
         # 计算平均分
-        avg_score = sum(s.total_score for s in self.scores) / len(self.scores) if self.scores else 0
+        avg_score = stats.average_score
         
         # 生成报告
         report = {
@@ -591,7 +1283,9 @@ class DocsQualityChecker:
                 }
                 for issue in self.issues
             ],
-            'recommendations': self.generate_recommendations()
+            'recommendations': self.generate_recommendations(type_counts),
+            **({'autofix': {'fixed_files': self.fixed_files, 'fix_counts': self.fix_counts}} if self.fix else {}),
+            **self.rule_stats_section()
         }
         
         # 保存报告
@@ -622,15 +1316,13 @@ class DocsQualityChecker:
         else:
             return "不及格"
     
-    def generate_recommendations(self) -> List[str]:
+    def generate_recommendations(self, type_counts: Optional[Dict[str, int]] = None) -> List[str]:
         """生成改进建议"""
         recommendations = []
         
         # 基于问题类型的建议
-        type_counts = {}
-        for issue in self.issues:
-            issue_type = issue.issue_type
-            type_counts[issue_type] = type_counts.get(issue_type, 0) + 1
+        if type_counts is None:
+            type_counts = self.stats.type_counts
         
         if 'missing_frontmatter' in type_counts:
             recommendations.append("为所有文档添加frontmatter，包含title、description、version等信息")
@@ -707,17 +1399,136 @@ class DocsQualityChecker:
         
         print("人类可读报告已保存到 docs-quality-report.md")
 
+def run_history_query(args):
+    """查询评分历史并输出结果，不重新检查文档"""
+    if not args.history or not Path(args.history).exists():
+        print("请使用 --history 指定已记录的评分数据库")
+        return
+    
+    history = QualityHistory(args.history)
+    try:
+        if args.regressions:
+            try:
+                base_commit = git_resolve_commit(args.regressions)
+            except subprocess.CalledProcessError:
+                print(f"无法解析引用 {args.regressions}")
+                return
+            base_run = history.latest_run(base_commit)
+            run_id = history.latest_run()
+            if base_run is None:
+                print(f"没有 {args.regressions} ({base_commit[:10]}) 的评分记录")
+                return
+            rows = history.regressions(base_run, run_id)
+            print(f"相对 {args.regressions} 评分下降的文件 ({len(rows)}):")
+            for file_path, old_score, new_score, delta in rows:
+                print(f"  {file_path}: {old_score:.1f} -> {new_score:.1f} ({delta:+.1f})")
+        elif args.trend:
+            rows = history.trend(args.trend)
+            print(f"{args.trend} 的评分趋势 ({len(rows)}):")
+            for commit_hash, dirty, created_at, total_score, issue_count in rows:
+                marker = '*' if dirty else ' '
+                timestamp = datetime.fromtimestamp(created_at).strftime("%Y-%m-%d %H:%M")
+                print(f"  {commit_hash[:10]}{marker} {timestamp} {total_score:.1f} ({issue_count} 个问题)")
+        else:
+            print("最近的运行 (提交 / 文件数 / 问题数 / 平均分):")
+            for run_id, commit_hash, dirty, created_at, total_files, total_issues, average_score in history.runs():
+                marker = '*' if dirty else ' '
+                print(f"  #{run_id} {commit_hash[:10]}{marker} {total_files} / {total_issues} / {average_score or 0:.1f}")
+    finally:
+        history.close()
+
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description="ZephyrUI 文档质量检查工具")
+    parser.add_argument('--docs-dir', '-d', default='doc', help='文档目录')
+    parser.add_argument('--ndjson', metavar='FILE', help='以 NDJSON 流式输出检查结果')
+    parser.add_argument('--jobs', '-j', type=int, default=1, help='并行检查的进程数（0 表示使用全部 CPU 核心）')
+    parser.add_argument('--cache', default='.quality-cache.json', help='检查结果缓存文件')
+    parser.add_argument('--no-cache', action='store_true', help='不使用检查结果缓存')
+    parser.add_argument('--cache-size', type=int, default=5000, help='缓存最大条目数')
+    parser.add_argument('--rules', metavar='FILE', help='规则配置文件（启用/禁用规则、权重和严重程度）')
+    parser.add_argument('--diff', metavar='BASE', help='只检查相对 git 基准（如 origin/main）改动的行，只运行行级规则')
+    parser.add_argument('--history', metavar='DB', help='把逐文件评分按提交记录到 SQLite 数据库')
+    parser.add_argument('--regressions', metavar='REF', help='查询相对某个提交或标签评分下降的文件（需要 --history）')
+    parser.add_argument('--trend', metavar='FILE', help='查询单个文件的评分趋势（需要 --history）')
+    parser.add_argument('--runs', action='store_true', help='列出最近的运行记录（需要 --history）')
+    parser.add_argument('--fix', action='store_true',
+                        help='先自动修复标题空行、代码块语言、表格、frontmatter 和一级标题，再对修复后的内容评分')
+    parser.add_argument('--watch', action='store_true', help='持续监视文档目录，只重新评分修改过的文件（忽略 --fix、--ndjson 和 --history）')
+    parser.add_argument('--interval', type=float, default=0.5, help='监视模式的轮询间隔（秒）')
+    parser.add_argument('--profile', action='store_true', help='打印每条规则的耗时和问题数，并写入报告（命中缓存的类别不计时）')
+    
+    args = parser.parse_args()
+    
+    if args.regressions or args.trend or args.runs:
+        run_history_query(args)
+        return
+    
     print("开始检查ZephyrUI文档质量...")
     
-    checker = DocsQualityChecker()
+    rules = None
+    if args.rules:
+        try:
+            rules = load_rule_config(args.rules)
+        except (OSError, ValueError) as e:
+            print(f"加载规则配置 {args.rules} 失败: {e}")
+            sys.exit(2)
+    
+    history = None
+    revision = None
+    if args.history and not (args.diff or args.watch):
+        # 先确定当前提交，失败时在开始检查之前退出
+        try:
+            revision = (git_resolve_commit('HEAD'), git_is_dirty([args.docs_dir]))
+        except (OSError, subprocess.CalledProcessError) as e:
+            print(f"无法确定当前提交，不能记录评分历史: {getattr(e, 'stderr', None) or e}")
+            sys.exit(2)
+        history = QualityHistory(args.history)
+    
+    stream = NdjsonReportWriter(args.ndjson, 'docs-quality-checker') if args.ndjson and not args.watch else None
+    cache = None
+    if not args.no_cache:
+        cache = QualityResultCache(args.cache, max_entries=args.cache_size)
+        cache.load()
+    
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    checker = DocsQualityChecker(args.docs_dir, stream=stream, jobs=jobs, cache=cache, rules=rules,
+                                 history=history, fix=args.fix and not (args.diff or args.watch), profile=args.profile)
+    
+    if args.watch:
+        if args.fix:
+            # 不在作者编辑文件的同时改写它
+            print("监视模式不支持 --fix，已忽略")
+        checker.watch(args.interval)
+        return
+    
+    if args.diff:
+        try:
+            issues = checker.check_changed_lines(args.diff)
+        except (OSError, subprocess.CalledProcessError) as e:
+            print(f"计算相对 {args.diff} 的改动失败: {getattr(e, 'stderr', None) or e}")
+            sys.exit(2)
+        if args.profile:
+            checker.print_rule_stats()
+        checker.generate_diff_report(args.diff, issues)
+        if stream is not None:
+            stream.close()
+        sys.exit(1 if issues else 0)
     
     # 检查所有文件
-    checker.check_all_files()
+    checker.check_all_files(revision)
+    if args.profile:
+        checker.print_rule_stats()
+    
+    if history is not None:
+        history.close()
     
     # 生成质量报告
-    checker.generate_quality_report()
+    if stream is not None:
+        checker.generate_stream_summary()
+        stream.close()
+    else:
+        checker.generate_quality_report()
     
     print("文档质量检查完成!")
 
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+ZephyrUI 文档工具的文件写入和磁盘缓存
+原子写文件，以及按 JSON 文件持久化的 LRU 缓存，供链接检查和质量检查共用
+"""
+
+import json
+import os
+import stat
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+def write_file_atomic(file_path, content: str):
+    """先写临时文件再重命名，保证目标文件不会处于写了一半的状态
+
+    mkstemp 创建的临时文件权限是 0600，重命名前改成原文件的权限；
+    目标文件不存在时按 umask 使用普通新建文件的权限
+    """
+    file_path = Path(file_path)
+    try:
+        mode = stat.S_IMODE(os.stat(file_path).st_mode)
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        mode = 0o666 & ~umask
+    fd, tmp_path = tempfile.mkstemp(dir=file_path.parent, prefix=f".{file_path.name}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+            f.write(content)
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+class JsonLruCache:
+    """以 JSON 文件持久化的 LRU 缓存
+
+    文件中按最近使用顺序保存条目，最久未使用的在前；cache_file 为 None 时只在内存中使用
+    """
+
+    def __init__(self, cache_file: Optional[str], max_entries: int = 5000):
+        self.cache_file = Path(cache_file) if cache_file else None
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self):
+        """从磁盘加载缓存"""
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, TypeError, ValueError):
+            return
+
+        for key, entry in data.get('entries', []):
+            self.entries[key] = entry
+        self._evict()
+
+    def save(self):
+        """原子地写回缓存文件"""
+        if self.cache_file is None:
+            return
+        with self._lock:
+            data = {'entries': list(self.entries.items())}
+
+        write_file_atomic(self.cache_file, json.dumps(data, ensure_ascii=False))
+
+    def get(self, key: str) -> Optional[Dict]:
+        """读取缓存条目，并标记为最近使用"""
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, entry: Dict):
+        """写入缓存条目"""
+        with self._lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            self._evict()
+
+    def _evict(self):
+        """按 LRU 顺序淘汰超出容量的条目"""
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
@@ -6,99 +6,1055 @@ ZephyrUI 文档链接检查工具
 
 import os
 import re
+import asyncio
+import threading
+import argparse
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Tuple
+from typing import Callable, List, Dict, Tuple, Iterable, Optional
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse, unquote
+import posixpath
+import hashlib
 import json
+import random
+import sqlite3
 import time
+import unicodedata
+
+from json_cache import JsonLruCache, write_file_atomic
+from markdown_links import LinkToken, FenceTracker, iter_file_links
+from ndjson_report import NdjsonReportWriter
+
+# 表示服务端限流或暂时不可用的状态码，需要重试而不是判为失效
+THROTTLE_STATUSES = {429, 503}
+
+SCHEME_PATTERN = re.compile(r'^[a-zA-Z][a-zA-Z0-9+.-]*:')
+
+class HostState:
+    """单个主机的调度状态"""
+    
+    def __init__(self, concurrency: int, burst: float):
+        self.concurrency = concurrency
+        self.slots = threading.BoundedSemaphore(concurrency)
+        self.async_slots: Optional[asyncio.Semaphore] = None  # 在事件循环中首次使用时创建
+        self.lock = threading.Lock()
+        self.tokens = burst
+        self.last_refill = time.monotonic()
+        self.blocked_until = 0.0
+        self.failures = 0
+        self.open_until = 0.0
+
+class HostScheduler:
+    """按主机限制并发与速率，支持 Retry-After、指数退避和熔断"""
+    
+    def __init__(self, per_host_limit: int = 4, rate: float = 5.0, burst: float = 5.0,
+                 max_retries: int = 3, backoff_base: float = 1.0, max_backoff: float = 60.0,
+                 failure_threshold: int = 5, cooldown: float = 60.0):
+        self.per_host_limit = per_host_limit
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.max_backoff = max_backoff
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.hosts: Dict[str, HostState] = {}
+        self._lock = threading.Lock()
+    
+    def get_host(self, url: str) -> HostState:
+        """获取（必要时创建）链接所属主机的状态"""
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            state = self.hosts.get(host)
+            if state is None:
+                state = HostState(self.per_host_limit, self.burst)
+                self.hosts[host] = state
+            return state
+    
+    def is_open(self, state: HostState) -> bool:
+        """熔断器是否处于打开状态"""
+        return time.monotonic() < state.open_until
+    
+    def take_token(self, state: HostState) -> float:
+        """尝试取得一个令牌：取得时返回 0，否则返回还需等待的秒数（Retry-After 窗口或令牌补充）"""
+        with state.lock:
+            now = time.monotonic()
+            state.tokens = min(self.burst, state.tokens + (now - state.last_refill) * self.rate)
+            state.last_refill = now
+            
+            if now < state.blocked_until:
+                return state.blocked_until - now
+            if state.tokens >= 1:
+                state.tokens -= 1
+                return 0.0
+            return (1 - state.tokens) / self.rate
+    
+    def wait_turn(self, state: HostState):
+        """等待 Retry-After 窗口结束并取得一个令牌"""
+        while True:
+            delay = self.take_token(state)
+            if not delay:
+                return
+            time.sleep(delay)
+    
+    async def acquire_async(self, state: HostState):
+        """在事件循环中先等到令牌、再取得主机的并发槽
+        
+        等待期间不占用工作线程，也不占着并发槽睡眠，繁忙或被限流的主机不会拖慢其他主机
+        """
+        while True:
+            delay = self.take_token(state)
+            if not delay:
+                break
+            await asyncio.sleep(delay)
+        if state.async_slots is None:
+            state.async_slots = asyncio.Semaphore(state.concurrency)
+        await state.async_slots.acquire()
+    
+    def release_async(self, state: HostState):
+        """归还 acquire_async 取得的并发槽"""
+        state.async_slots.release()
+    
+    def backoff(self, attempt: int) -> float:
+        """第 attempt 次重试前的退避时间（带随机抖动）"""
+        delay = min(self.max_backoff, self.backoff_base * (2 ** attempt))
+        return delay * random.uniform(0.5, 1.0)
+    
+    def defer(self, state: HostState, delay: float):
+        """在 delay 秒内暂停向该主机发送请求"""
+        with state.lock:
+            state.blocked_until = max(state.blocked_until, time.monotonic() + delay)
+    
+    def record_success(self, state: HostState):
+        """记录一次成功请求，关闭熔断器"""
+        with state.lock:
+            state.failures = 0
+            state.open_until = 0.0
+    
+    def record_failure(self, state: HostState):
+        """记录一次限流响应（429/503），连续限流过多时打开熔断器"""
+        with state.lock:
+            state.failures += 1
+            if state.failures >= self.failure_threshold:
+                state.open_until = time.monotonic() + self.cooldown
+    
+    @staticmethod
+    def parse_retry_after(value: Optional[str]) -> Optional[float]:
+        """解析 Retry-After 头（秒数或 HTTP 日期）"""
+        if not value:
+            return None
+        value = value.strip()
+        if value.isdigit():
+            return float(value)
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+class FileIndex:
+    """文档目录的内存文件索引，一次 scandir 遍历建立，之后内部链接检查只做集合查找"""
+    
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.files = set()
+        self.dirs = {'.'}
+    
+    def build(self) -> 'FileIndex':
+        """遍历根目录，记录所有文件和目录的相对路径（POSIX 形式）"""
+        stack = [(str(self.root), '')]
+        while stack:
+            dir_path, rel_dir = stack.pop()
+            try:
+                with os.scandir(dir_path) as it:
+                    for entry in it:
+                        rel_path = f"{rel_dir}{entry.name}"
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name.startswith('.') or entry.name == 'node_modules':
+                                continue
+                            self.dirs.add(rel_path)
+                            stack.append((entry.path, rel_path + '/'))
+                        else:
+                            self.files.add(rel_path)
+            except OSError as e:
+                print(f"读取目录 {dir_path} 时出错: {e}")
+        return self
+    
+    def relative_key(self, file_path: Path) -> str:
+        """文件相对于根目录的索引键"""
+        return Path(os.path.relpath(file_path, self.root)).as_posix()
+    
+    def normalize(self, url: str, current_file: Path) -> str:
+        """把链接规范化为相对于根目录的路径（去掉锚点和查询参数）"""
+        path = unquote(url.split('#', 1)[0].split('?', 1)[0])
+        if not path:
+            return self.relative_key(current_file)
+        if path.startswith('/'):
+            # VitePress 中以 / 开头的链接相对于文档根目录
+            return posixpath.normpath(path.lstrip('/')) if path.strip('/') else '.'
+        current_dir = posixpath.dirname(self.relative_key(current_file))
+        return posixpath.normpath(posixpath.join(current_dir, path))
+    
+    def resolve(self, url: str, current_file: Path) -> Optional[str]:
+        """解析链接目标，返回命中的索引键，找不到时返回 None"""
+        key = self.normalize(url, current_file)
+        
+        if key == '..' or key.startswith('../'):
+            # 指向文档目录之外的链接无法通过索引判断，回退到文件系统
+            return key if os.path.exists(os.path.join(self.root, key)) else None
+        
+        if key in self.files or key in self.dirs:
+            return key
+        
+        # 兼容 VitePress 的简洁链接: foo -> foo.md, foo.html -> foo.md, foo/ -> foo/index.md
+        stem = key[:-5] if key.endswith('.html') else key
+        for candidate in (stem + '.md', posixpath.join(stem, 'index.md')):
+            if candidate in self.files:
+                return candidate
+        return None
+    
+    def markdown_files(self) -> List[Path]:
+        """按路径排序返回所有 Markdown 文件"""
+        return [self.root / rel_path for rel_path in sorted(self.files) if rel_path.endswith('.md')]
+
+class AnchorIndex:
+    """按文件缓存标题锚点（slug），每个文件每次运行最多解析一次"""
+    
+    # 与 VitePress (@mdit-vue/shared) 的 slugify 规则保持一致
+    CONTROL_PATTERN = re.compile(r'[\u0000-\u001f]')
+    SPECIAL_PATTERN = re.compile(r'[\s~`!@#$%^&*()\-_+=\[\]{}|\\;:"\'“”‘’<>,.?/]+')
+    COMBINING_PATTERN = re.compile(r'[\u0300-\u036f]')
+    HEADING_PATTERN = re.compile(r'^ {0,3}(#{1,6})\s+(.*?)(?:\s+#+)?\s*$')
+    CUSTOM_ID_PATTERN = re.compile(r'\s*\{#([^}\s]+)\}\s*$')
+    HTML_ID_PATTERN = re.compile(r'<a\s[^>]*(?:id|name)=["\']([^"\']+)["\']', re.IGNORECASE)
+    
+    def __init__(self, file_index: FileIndex):
+        self.file_index = file_index
+        self.anchors: Dict[str, set] = {}
+    
+    @classmethod
+    def slugify(cls, text: str) -> str:
+        """生成与 VitePress 相同的标题锚点"""
+        slug = unicodedata.normalize('NFKD', text)
+        slug = cls.COMBINING_PATTERN.sub('', slug)
+        slug = cls.CONTROL_PATTERN.sub('', slug)
+        slug = cls.SPECIAL_PATTERN.sub('-', slug)
+        slug = re.sub(r'-{2,}', '-', slug).strip('-')
+        slug = re.sub(r'^(\d)', r'_\1', slug)
+        return slug.lower()
+    
+    @staticmethod
+    def heading_text(raw: str) -> str:
+        """去掉标题中的行内 Markdown 语法，得到渲染后的纯文本"""
+        text = re.sub(r'!?\[([^\]]*)\]\([^)]*\)', r'\1', raw)
+        text = re.sub(r'<[^>]+>', '', text)
+        return text.replace('`', '')
+    
+    def parse_anchors(self, file_path: Path) -> set:
+        """解析文件中的所有锚点，重复标题按 VitePress 规则追加 -1、-2 后缀"""
+        anchors = set()
+        counts: Dict[str, int] = {}
+        fences = FenceTracker()
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if fences.update(line):
+                        continue
+                    
+                    anchors.update(self.HTML_ID_PATTERN.findall(line))
+                    
+                    match = self.HEADING_PATTERN.match(line)
+                    if not match:
+                        continue
+                    title = match.group(2)
+                    custom_id = self.CUSTOM_ID_PATTERN.search(title)
+                    if custom_id:
+                        anchors.add(custom_id.group(1))
+                        continue
+                    
+                    slug = self.slugify(self.heading_text(title))
+                    if slug in counts:
+                        counts[slug] += 1
+                        slug = f"{slug}-{counts[slug]}"
+                    else:
+                        counts[slug] = 0
+                    anchors.add(slug)
+        except Exception as e:
+            print(f"读取文件 {file_path} 时出错: {e}")
+        return anchors
+    
+    def get(self, key: str) -> set:
+        """获取索引键对应文件的锚点集合"""
+        anchors = self.anchors.get(key)
+        if anchors is None:
+            anchors = self.parse_anchors(self.file_index.root / key)
+            self.anchors[key] = anchors
+        return anchors
+    
+    def has_anchor(self, key: str, fragment: str) -> bool:
+        """判断目标文件中是否存在该锚点"""
+        return unquote(fragment) in self.get(key)
+
+class RepairIndex:
+    """基于三元组倒排索引的链接修复候选检索"""
+    
+    NAME_PREFIXES = ('zephyr_', 'velocity_')
+    CONTEXT_WEIGHT = 0.15
+    
+    def __init__(self):
+        self.targets: List[str] = []
+        self.names: List[str] = []
+        self.trigrams: List[set] = []
+        self.postings: Dict[str, List[int]] = {}
+    
+    @classmethod
+    def normalize_name(cls, name: str) -> str:
+        """规范化名称: ZephyrDatePicker / date-picker / DatePicker -> date_picker"""
+        name = re.sub(r'([a-z0-9])([A-Z])', r'\1_\2', name)
+        name = re.sub(r'[^0-9a-zA-Z\u4e00-\u9fff]+', '_', name).strip('_').lower()
+        for prefix in cls.NAME_PREFIXES:
+            if name.startswith(prefix) and len(name) > len(prefix):
+                name = name[len(prefix):]
+        return name
+    
+    @staticmethod
+    def make_trigrams(name: str) -> set:
+        """生成带边界填充的三元组集合"""
+        padded = f"  {name} "
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+    
+    def add(self, name: str, target: str):
+        """添加一个名称 -> 目标文档的候选"""
+        normalized = self.normalize_name(name)
+        if not normalized:
+            return
+        entry_id = len(self.targets)
+        grams = self.make_trigrams(normalized)
+        self.targets.append(target)
+        self.names.append(normalized)
+        self.trigrams.append(grams)
+        for gram in grams:
+            self.postings.setdefault(gram, []).append(entry_id)
+    
+    def build(self, file_index: FileIndex, lib_dir: Path, aliases: Dict[str, str]) -> 'RepairIndex':
+        """从文档文件、组件源码目录和别名映射建立索引"""
+        doc_files = [key for key in file_index.files if key.endswith('.md')]
+        doc_set = set(doc_files)
+        
+        for key in doc_files:
+            stem = posixpath.splitext(posixpath.basename(key))[0]
+            if stem in ('index', 'README'):
+                stem = posixpath.basename(posixpath.dirname(key)) or stem
+            self.add(stem, key)
+        
+        # lib/src/components/<分类>/<组件>/ 下的类名映射到 doc/components/<分类>/<组件>.md
+        class_pattern = re.compile(r'^class\s+(\w+)', re.MULTILINE)
+        if lib_dir.is_dir():
+            for category_dir in sorted(p for p in lib_dir.iterdir() if p.is_dir()):
+                for component_dir in sorted(p for p in category_dir.iterdir() if p.is_dir()):
+                    target = f"components/{category_dir.name}/{component_dir.name}.md"
+                    if target not in doc_set:
+                        continue
+                    for dart_file in component_dir.glob('*.dart'):
+                        try:
+                            content = dart_file.read_text(encoding='utf-8')
+                        except Exception:
+                            continue
+                        for class_name in class_pattern.findall(content):
+                            self.add(class_name, target)
+        
+        for name, target in aliases.items():
+            if target in doc_set:
+                self.add(name, target)
+        
+        return self
+    
+    def search(self, query: str, limit: int = 5, context: str = '') -> List[Tuple[str, float]]:
+        """返回按得分排序的候选目标 [(索引键, 得分)]，得分基于三元组 Dice 系数"""
+        normalized = self.normalize_name(query)
+        if not normalized:
+            return []
+        grams = self.make_trigrams(normalized)
+        
+        overlaps: Dict[int, int] = {}
+        for gram in grams:
+            for entry_id in self.postings.get(gram, ()):
+                overlaps[entry_id] = overlaps.get(entry_id, 0) + 1
+        
+        # 名称相似度为主，目录重合度作为补充（权重 CONTEXT_WEIGHT）
+        context_dirs = set(posixpath.dirname(context).split('/')) - {'', '.', '..'}
+        best: Dict[str, float] = {}
+        for entry_id, overlap in overlaps.items():
+            score = 2 * overlap / (len(grams) + len(self.trigrams[entry_id]))
+            target = self.targets[entry_id]
+            if context_dirs:
+                target_dirs = set(posixpath.dirname(target).split('/')) - {''}
+                dir_score = len(context_dirs & target_dirs) / len(context_dirs)
+                score = (1 - self.CONTEXT_WEIGHT) * score + self.CONTEXT_WEIGHT * dir_score
+            if score > best.get(target, 0):
+                best[target] = score
+        
+        ranked = sorted(best.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:limit]
+
+class LinkGraph:
+    """持久化的正向/反向链接图，用于增量检查"""
+    
+    VERSION = 1
+    
+    def __init__(self, graph_file: str = ".link-graph.json"):
+        self.graph_file = Path(graph_file)
+        # 索引键 -> {'hash', 'targets', 'broken', 'skipped'}
+        self.files: Dict[str, Dict] = {}
+        self.known_files: set = set()
+    
+    def load(self):
+        """从磁盘加载链接图"""
+        try:
+            with open(self.graph_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('version') != self.VERSION:
+            return
+        self.files = data.get('files', {})
+        self.known_files = set(data.get('known_files', []))
+    
+    def save(self):
+        """原子地写回链接图"""
+        data = {
+            'version': self.VERSION,
+            'files': self.files,
+            'known_files': sorted(self.known_files)
+        }
+        write_file_atomic(self.graph_file, json.dumps(data, ensure_ascii=False))
+    
+    @staticmethod
+    def hash_file(file_path: Path) -> str:
+        """计算文件内容哈希"""
+        with open(file_path, 'rb') as f:
+            return hashlib.sha1(f.read()).hexdigest()
+    
+    def reverse_links(self) -> Dict[str, set]:
+        """由正向图构建反向图: 目标 -> 链接到它的文件"""
+        reverse: Dict[str, set] = {}
+        for source, entry in self.files.items():
+            for target in entry['targets']:
+                reverse.setdefault(target, set()).add(source)
+        return reverse
+    
+    @staticmethod
+    def target_aliases(key: str) -> List[str]:
+        """同一文件可能被链接的几种写法（foo.md、foo、foo.html、目录 index）"""
+        aliases = [key]
+        if key.endswith('.md'):
+            stem = key[:-3]
+            aliases.extend([stem, stem + '.html'])
+            if posixpath.basename(key) == 'index.md':
+                aliases.append(posixpath.dirname(key) or '.')
+        return aliases
+    
+    def plan(self, hashes: Dict[str, str], all_files: set) -> set:
+        """返回需要重新检查的文件：内容变化的文件，以及链接到变化、移动或删除目标的文件"""
+        changed = {key for key, digest in hashes.items()
+                   if self.files.get(key, {}).get('hash') != digest}
+        touched = changed | (self.known_files ^ all_files)
+        
+        reverse = self.reverse_links()
+        affected = set(changed)
+        for key in touched:
+            for alias in self.target_aliases(key):
+                affected.update(reverse.get(alias, ()))
+        
+        # 删除已不存在的文件
+        for key in list(self.files):
+            if key not in hashes:
+                del self.files[key]
+        self.known_files = set(all_files)
+        
+        return affected & set(hashes)
+    
+    def record(self, key: str, digest: str, targets: List[str], broken: List[Dict], skipped: List[Dict]):
+        """记录文件的链接目标和检查结果"""
+        self.files[key] = {
+            'hash': digest,
+            'targets': sorted(set(targets)),
+            'broken': broken,
+            'skipped': skipped
+        }
+
+class LinkDatabase:
+    """SQLite 链接数据库，保存页面、链接、锚点和检查结果，支持孤立页面、枢纽页面等查询"""
+    
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS pages (
+        path TEXT PRIMARY KEY,
+        hash TEXT,
+        checked_at REAL
+    );
+    CREATE TABLE IF NOT EXISTS links (
+        source TEXT NOT NULL,
+        line INTEGER NOT NULL,
+        col INTEGER NOT NULL,
+        url TEXT NOT NULL,
+        type TEXT NOT NULL,
+        target TEXT,
+        fragment TEXT,
+        domain TEXT,
+        status TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS anchors (
+        path TEXT NOT NULL,
+        anchor TEXT NOT NULL,
+        PRIMARY KEY (path, anchor)
+    );
+    CREATE INDEX IF NOT EXISTS idx_links_source ON links(source);
+    CREATE INDEX IF NOT EXISTS idx_links_target ON links(target);
+    CREATE INDEX IF NOT EXISTS idx_links_domain ON links(domain);
+    CREATE INDEX IF NOT EXISTS idx_links_status ON links(status);
+    """
+    
+    def __init__(self, db_file: str, docs_dir: str = "doc"):
+        self.db_file = db_file
+        self.docs_dir = Path(docs_dir)
+        self.conn = sqlite3.connect(db_file)
+        self.conn.executescript(self.SCHEMA)
+    
+    def page_path(self, key: str) -> str:
+        """索引键 -> 数据库中的页面路径（如 doc/components/form/input.md）"""
+        return posixpath.normpath((self.docs_dir / key).as_posix())
+    
+    def normalize_path(self, path: str) -> str:
+        """接受 doc/xxx.md 或相对文档目录的 xxx.md 两种写法"""
+        path = posixpath.normpath(Path(path).as_posix())
+        prefix = self.docs_dir.as_posix().rstrip('/') + '/'
+        return path if path.startswith(prefix) else self.page_path(path)
+    
+    def update_page(self, key: str, digest: Optional[str], records: List[Dict], anchors: Iterable[str]):
+        """替换单个页面的链接和锚点数据"""
+        path = self.page_path(key)
+        cursor = self.conn.cursor()
+        cursor.execute("INSERT OR REPLACE INTO pages (path, hash, checked_at) VALUES (?, ?, ?)",
+                       (path, digest, time.time()))
+        cursor.execute("DELETE FROM links WHERE source = ?", (path,))
+        cursor.execute("DELETE FROM anchors WHERE path = ?", (path,))
+        
+        rows = []
+        for record in records:
+            url = record['url']
+            fragment = url.split('#', 1)[1] if '#' in url else None
+            target = self.page_path(record['target']) if record['target'] else None
+            domain = urlparse(url).netloc.lower() if record['type'] == 'external' else None
+            rows.append((path, record['line'], record['column'], url, record['type'],
+                         target, fragment, domain, record['status']))
+        cursor.executemany("INSERT INTO links (source, line, col, url, type, target, fragment, domain, status) "
+                           "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        cursor.executemany("INSERT OR IGNORE INTO anchors (path, anchor) VALUES (?, ?)",
+                           [(path, anchor) for anchor in anchors])
+    
+    def page_hashes(self) -> Dict[str, Optional[str]]:
+        """已写入的页面路径 -> 写入时的文件哈希"""
+        return dict(self.conn.execute("SELECT path, hash FROM pages"))
+    
+    def remove_missing_pages(self, keys: Iterable[str]):
+        """删除已不存在的页面及其数据"""
+        current = {self.page_path(key) for key in keys}
+        stale = [path for (path,) in self.conn.execute("SELECT path FROM pages") if path not in current]
+        for path in stale:
+            self.conn.execute("DELETE FROM pages WHERE path = ?", (path,))
+            self.conn.execute("DELETE FROM links WHERE source = ?", (path,))
+            self.conn.execute("DELETE FROM anchors WHERE path = ?", (path,))
+    
+    def commit(self):
+        """提交事务"""
+        self.conn.commit()
+    
+    def close(self):
+        """关闭数据库连接"""
+        self.conn.close()
+    
+    def inbound(self, path: str) -> List[Tuple]:
+        """链接到指定页面的所有位置"""
+        return self.conn.execute(
+            "SELECT source, line, url, status FROM links WHERE target = ? ORDER BY source, line",
+            (self.normalize_path(path),)).fetchall()
+    
+    def outbound(self, path: str) -> List[Tuple]:
+        """指定页面中的所有链接"""
+        return self.conn.execute(
+            "SELECT line, url, type, status FROM links WHERE source = ? ORDER BY line, col",
+            (self.normalize_path(path),)).fetchall()
+    
+    def orphans(self) -> List[Tuple]:
+        """没有被其他页面链接的页面（侧边栏等配置中的导航不计入）"""
+        return self.conn.execute(
+            "SELECT p.path FROM pages p WHERE NOT EXISTS ("
+            "SELECT 1 FROM links l WHERE l.target = p.path AND l.source != p.path) "
+            "ORDER BY p.path").fetchall()
+    
+    def hubs(self, limit: int = 20) -> List[Tuple]:
+        """按入链和出链数量排序的枢纽页面"""
+        return self.conn.execute(
+            "SELECT p.path,"
+            " (SELECT COUNT(*) FROM links l WHERE l.target = p.path AND l.source != p.path) AS inbound,"
+            " (SELECT COUNT(*) FROM links l WHERE l.source = p.path AND l.type = 'internal') AS outbound "
+            "FROM pages p ORDER BY inbound + outbound DESC, p.path LIMIT ?", (limit,)).fetchall()
+    
+    def domains(self) -> List[Tuple]:
+        """依赖的外部域名统计"""
+        return self.conn.execute(
+            "SELECT domain, COUNT(*), COUNT(DISTINCT source), SUM(status = 'broken') "
+            "FROM links WHERE domain IS NOT NULL GROUP BY domain ORDER BY COUNT(*) DESC, domain").fetchall()
+    
+    def broken(self) -> List[Tuple]:
+        """所有失效链接"""
+        return self.conn.execute(
+            "SELECT source, line, url, type FROM links WHERE status = 'broken' ORDER BY source, line").fetchall()
+
+class ExternalLinkCache(JsonLruCache):
+    """外部链接检查结果的磁盘缓存（TTL + LRU）"""
+    
+    def __init__(self, cache_file: str = ".link-cache.json", ttl: float = 24 * 3600, max_entries: int = 5000):
+        super().__init__(cache_file, max_entries)
+        self.ttl = ttl
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+    
+    def is_fresh(self, entry: Dict) -> bool:
+        """判断缓存条目是否仍在有效期内"""
+        return time.time() - entry['checked_at'] < self.ttl
+
+class LinkCassette:
+    """外部链接检查结果的录制/回放文件，回放时完全不访问网络"""
+    
+    def __init__(self, cassette_file: str, mode: str = 'replay'):
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"未知的录制模式: {mode}")
+        self.cassette_file = Path(cassette_file)
+        self.mode = mode
+        self.entries: Dict[str, Dict] = {}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+    
+    @property
+    def replaying(self) -> bool:
+        return self.mode == 'replay'
+    
+    def load(self):
+        """加载录制文件，回放模式下文件必须存在"""
+        try:
+            with open(self.cassette_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            if self.replaying:
+                raise
+            return
+        self.entries = data.get('entries', {})
+    
+    def save(self):
+        """按 URL 排序写回录制文件，便于提交到仓库后比较差异"""
+        with self._lock:
+            data = {'entries': dict(sorted(self.entries.items()))}
+        write_file_atomic(self.cassette_file, json.dumps(data, ensure_ascii=False, indent=2) + '\n')
+    
+    def get(self, url: str) -> Optional[Dict]:
+        """读取录制的结果"""
+        with self._lock:
+            entry = self.entries.get(url)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return entry
+    
+    def put(self, url: str, entry: Dict):
+        """录制一次请求结果，只保留状态码和最终地址，保证文件内容稳定"""
+        with self._lock:
+            self.entries[url] = {'status': entry['status'], 'final_url': entry.get('final_url') or url}
 
 class LinkChecker:
-    def __init__(self, docs_dir: str = "doc"):
+    def __init__(self, docs_dir: str = "doc", max_workers: int = 16,
+                 cache: Optional[ExternalLinkCache] = None,
+                 scheduler: Optional[HostScheduler] = None,
+                 link_graph: Optional[LinkGraph] = None,
+                 link_db: Optional['LinkDatabase'] = None,
+                 cassette: Optional[LinkCassette] = None,
+                 stream: Optional[NdjsonReportWriter] = None,
+                 lib_dir: str = "lib/src/components", min_repair_score: float = 0.6):
         self.docs_dir = Path(docs_dir)
+        self.lib_dir = Path(lib_dir)
+        self.min_repair_score = min_repair_score
         self.broken_links = []
+        self.skipped_links = []
         self.fixed_links = []
         self.link_mapping = {}
+        self.max_workers = max_workers
+        self.cache = cache
+        self.scheduler = scheduler or HostScheduler()
+        self.link_graph = link_graph
+        self.link_db = link_db
+        self.cassette = cassette
+        self.stream = stream
+        self.file_index: Optional[FileIndex] = None
+        self.anchor_index: Optional[AnchorIndex] = None
+        self.repair_index: Optional[RepairIndex] = None
+        # 每个工作线程持有独立的 Session，复用 keep-alive 连接
+        self._local = threading.local()
         
+    def get_file_index(self) -> FileIndex:
+        """获取文档目录的文件索引（首次调用时建立）"""
+        if self.file_index is None:
+            self.file_index = FileIndex(self.docs_dir).build()
+        return self.file_index
+    
     def find_markdown_files(self) -> List[Path]:
         """查找所有Markdown文件"""
-        return list(self.docs_dir.rglob("*.md"))
+        return self.get_file_index().markdown_files()
     
-    def extract_links(self, file_path: Path) -> List[Tuple[str, int]]:
-        """提取文件中的所有链接"""
+    def extract_links(self, file_path: Path) -> List[LinkToken]:
+        """提取文件中的所有链接（跳过代码块，包含引用式链接、图片、自动链接和 HTML 链接）"""
         links = []
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-                for line_num, line in enumerate(lines, 1):
-                    # 匹配 Markdown 链接 [text](url)
-                    markdown_links = re.findall(r'\[([^\]]+)\]\(([^)]+)\)', line)
-                    for text, url in markdown_links:
-                        links.append((url, line_num))
+            links = list(iter_file_links(file_path))
         except Exception as e:
             print(f"读取文件 {file_path} 时出错: {e}")
         return links
     
+    def get_anchor_index(self) -> AnchorIndex:
+        """获取标题锚点索引"""
+        if self.anchor_index is None:
+            self.anchor_index = AnchorIndex(self.get_file_index())
+        return self.anchor_index
+    
     def check_internal_link(self, url: str, current_file: Path) -> bool:
-        """检查内部链接是否有效"""
-        # 处理相对路径
-        if url.startswith('./'):
-            url = url[2:]
-        elif url.startswith('../'):
-            # 处理上级目录
-            parts = url.split('../')
-            base_path = current_file.parent
-            for part in parts[1:]:
-                if part == '':
-                    continue
-                if part.endswith('/'):
-                    base_path = base_path.parent
-                else:
-                    base_path = base_path / part
-            target_path = base_path
-        else:
-            target_path = current_file.parent / url
+        """检查内部链接是否有效（包括 #锚点）"""
+        key = self.get_file_index().resolve(url, current_file)
+        if key is None:
+            return False
+        
+        fragment = url.split('#', 1)[1] if '#' in url else ''
+        if fragment and key.endswith('.md') and not key.startswith('../'):
+            return self.get_anchor_index().has_anchor(key, fragment)
+        return True
+    
+    def get_session(self) -> requests.Session:
+        """获取当前线程的 HTTP 会话"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=self.max_workers,
+                                                    pool_maxsize=self.max_workers)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self._local.session = session
+        return session
+    
+    def check_external_link(self, url: str) -> Optional[bool]:
+        """检查外部链接是否有效，无法判定（限流、熔断或离线）时返回 None"""
+        known, cached = self.lookup_external_link(url)
+        if known is not None:
+            return self.external_link_valid(known)
+        return self.store_external_link(url, self.request_external_link(url, cached), cached)
+    
+    async def check_external_link_async(self, url: str, executor: ThreadPoolExecutor) -> Optional[bool]:
+        """check_external_link 的异步版本，只有 HTTP 请求在线程池中执行"""
+        known, cached = self.lookup_external_link(url)
+        if known is not None:
+            return self.external_link_valid(known)
+        entry = await self.request_external_link_async(url, cached, executor)
+        return self.store_external_link(url, entry, cached)
+    
+    def lookup_external_link(self, url: str) -> Tuple[Optional[Dict], Optional[Dict]]:
+        """不访问网络能得到的结果，返回 (可直接使用的条目, 需要重新验证的缓存条目)
         
-        # 移除锚点
-        if '#' in str(target_path):
-            target_path = str(target_path).split('#')[0]
+        回放模式下未录制的链接返回 {'skipped': 'not_recorded'}，结果未知
+        """
+        if self.cassette is not None and self.cassette.replaying:
+            # 回放模式不访问网络，未录制的链接结果未知
+            return self.cassette.get(url) or {'skipped': 'not_recorded'}, None
+        if self.cache is None:
+            return None, None
         
-        return target_path.exists()
+        cached = self.cache.get(url)
+        if cached is not None and self.cache.is_fresh(cached):
+            self.cache.hits += 1
+            if self.cassette is not None:
+                self.cassette.put(url, cached)
+            return cached, None
+        return None, cached
     
-    def check_external_link(self, url: str) -> bool:
-        """检查外部链接是否有效"""
+    def external_link_valid(self, entry: Dict) -> Optional[bool]:
+        """由检查结果判断链接是否有效，跳过的请求结果未知"""
+        if entry.get('skipped'):
+            return None
+        return 0 < entry['status'] < 400
+    
+    def store_external_link(self, url: str, entry: Dict, cached: Optional[Dict]) -> Optional[bool]:
+        """把请求结果写入缓存和录制文件，返回链接是否有效"""
+        if entry.get('skipped') or entry['status'] == 0:
+            # 网络错误不写入缓存也不录制，避免偶发故障被长期记住，回放时按未知处理
+            return self.external_link_valid(entry)
+        
+        if self.cache is not None:
+            if cached is not None and entry['status'] == 304:
+                self.cache.revalidated += 1
+                entry = {**cached, 'checked_at': entry['checked_at']}
+            else:
+                self.cache.misses += 1
+            self.cache.put(url, entry)
+        if self.cassette is not None:
+            self.cassette.put(url, entry)
+        return self.external_link_valid(entry)
+    
+    def prepare_request(self, url: str, cached: Optional[Dict]) -> Tuple[str, Dict[str, str]]:
+        """请求地址和请求头，有缓存条目时使用 ETag/Last-Modified 条件请求"""
+        headers = {}
+        target_url = url
+        if cached is not None:
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+            if headers:
+                # 直接对上次的最终地址做条件请求，跳过重定向链
+                target_url = cached.get('final_url') or url
+        return target_url, headers
+    
+    def send_request(self, target_url: str, headers: Dict[str, str]) -> Optional[requests.Response]:
+        """发送一次 HEAD 请求，连接失败时返回 None"""
         try:
-            response = requests.head(url, timeout=10, allow_redirects=True)
-            return response.status_code < 400
+            return self.get_session().head(target_url, timeout=10, allow_redirects=True, headers=headers)
         except:
+            return None
+    
+    def should_retry(self, state: HostState, response: Optional[requests.Response], attempt: int) -> bool:
+        """记录一次请求的结果，返回是否需要重试"""
+        scheduler = self.scheduler
+        if response is None:
+            # 连接失败直接判为失效：不重试，也不计入熔断，避免同一主机的其他失效链接被当作未知
             return False
+        if response.status_code not in THROTTLE_STATUSES:
+            scheduler.record_success(state)
+            return False
+        
+        # 只有限流响应才计入熔断并按 Retry-After 或指数退避重试
+        scheduler.record_failure(state)
+        if attempt >= scheduler.max_retries:
+            return False
+        retry_after = scheduler.parse_retry_after(response.headers.get('Retry-After'))
+        scheduler.defer(state, retry_after if retry_after is not None else scheduler.backoff(attempt))
+        return True
+    
+    def request_external_link(self, url: str, cached: Optional[Dict] = None) -> Dict:
+        """请求外部链接，按主机限制并发和速率，限流时重试"""
+        target_url, headers = self.prepare_request(url, cached)
+        scheduler = self.scheduler
+        state = scheduler.get_host(target_url)
+        response = None
+        for attempt in range(scheduler.max_retries + 1):
+            if scheduler.is_open(state):
+                return {'status': 0, 'final_url': url, 'checked_at': time.time(), 'skipped': 'circuit_open'}
+            with state.slots:
+                scheduler.wait_turn(state)
+                response = self.send_request(target_url, headers)
+            if not self.should_retry(state, response, attempt):
+                break
+        return self.response_entry(url, response)
+    
+    async def request_external_link_async(self, url: str, cached: Optional[Dict],
+                                          executor: ThreadPoolExecutor) -> Dict:
+        """request_external_link 的异步版本：令牌和主机并发槽在事件循环中取得，
+        只有主机有空闲槽时才把请求交给工作线程"""
+        target_url, headers = self.prepare_request(url, cached)
+        scheduler = self.scheduler
+        state = scheduler.get_host(target_url)
+        loop = asyncio.get_running_loop()
+        response = None
+        for attempt in range(scheduler.max_retries + 1):
+            if scheduler.is_open(state):
+                return {'status': 0, 'final_url': url, 'checked_at': time.time(), 'skipped': 'circuit_open'}
+            await scheduler.acquire_async(state)
+            try:
+                response = await loop.run_in_executor(executor, self.send_request, target_url, headers)
+            finally:
+                scheduler.release_async(state)
+            if not self.should_retry(state, response, attempt):
+                break
+        return self.response_entry(url, response)
+    
+    def response_entry(self, url: str, response: Optional[requests.Response]) -> Dict:
+        """把最后一次响应转换为缓存条目"""
+        if response is None:
+            return {'status': 0, 'final_url': url, 'checked_at': time.time()}
+        if response.status_code in THROTTLE_STATUSES:
+            return {'status': response.status_code, 'final_url': url, 'checked_at': time.time(),
+                    'skipped': 'throttled'}
+        
+        return {
+            'status': response.status_code,
+            'final_url': response.url,
+            'checked_at': time.time(),
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified')
+        }
+    
+    async def check_external_links_async(self, urls: Iterable[str],
+                                         on_result: Optional[Callable[[str, Optional[bool]], None]] = None
+                                         ) -> Dict[str, Optional[bool]]:
+        """并发检查外部链接，返回 url -> 是否有效（None 表示无法判定）
+        
+        设置 on_result 时每得到一个结果就立即回调（在事件循环线程中）
+        """
+        unique_urls = list(dict.fromkeys(urls))
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            async def check(url: str) -> Tuple[str, Optional[bool]]:
+                valid = await self.check_external_link_async(url, executor)
+                if on_result is not None:
+                    on_result(url, valid)
+                return url, valid
+            
+            results = await asyncio.gather(*(check(url) for url in unique_urls))
+        
+        return dict(results)
+    
+    def collect_links(self, file_path: Path) -> List[Tuple[Path, int, int, str, str]]:
+        """提取并分类单个文件的链接，返回 (文件, 行号, 列号, url, 类型)"""
+        collected = []
+        links = self.extract_links(file_path)
+        defined_labels = {link.label for link in links if link.kind == 'definition'}
+        
+        for link in links:
+            if link.kind == 'reference':
+                # 引用式链接的 URL 由定义行检查，这里只检查标签是否已定义
+                if link.label not in defined_labels:
+                    collected.append((file_path, link.line, link.column, f"[{link.label}]", 'reference'))
+            elif link.url.startswith('http') or link.url.startswith('https'):
+                collected.append((file_path, link.line, link.column, link.url, 'external'))
+            elif SCHEME_PATTERN.match(link.url):
+                # mailto:、tel: 等其他协议不做检查
+                continue
+            else:
+                collected.append((file_path, link.line, link.column, link.url, 'internal'))
+        return collected
     
-    def check_all_links(self):
-        """检查所有文档中的链接"""
+    def check_all_links(self, use_async: bool = False):
+        """检查所有文档中的链接（设置了 link_graph 时只检查受影响的文件）"""
         markdown_files = self.find_markdown_files()
+        file_index = self.get_file_index()
+        keys = [file_index.relative_key(file_path) for file_path in markdown_files]
         
-        for file_path in markdown_files:
-            print(f"检查文件: {file_path}")
-            links = self.extract_links(file_path)
+        hashes = {}
+        to_check = set(keys)
+        if self.link_graph is not None:
+            hashes = {key: LinkGraph.hash_file(file_path) for key, file_path in zip(keys, markdown_files)}
+            to_check = self.link_graph.plan(hashes, set(file_index.files))
+            if self.link_db is not None:
+                # 数据库中缺少或内容已变化的页面也要重新检查，保证查询基于完整的数据
+                stored = self.link_db.page_hashes()
+                to_check |= {key for key in keys if stored.get(self.link_db.page_path(key)) != hashes[key]}
+            print(f"增量检查: {len(to_check)}/{len(keys)} 个文件需要重新检查")
+        
+        # 逐个文件收集链接：内部链接和引用立即判定，流式输出时每个问题一产生就写出；
+        # 外部链接按 URL 归并，得到结果时再判定所有引用它的位置
+        results: Dict[str, Tuple[List[str], List[Tuple[Dict, Dict]]]] = {}
+        pending_external: Dict[str, List[Tuple[Dict, Dict]]] = {}
+        for file_path, key in zip(markdown_files, keys):
+            if key not in to_check:
+                # 未受影响的文件沿用上次的检查结果
+                stored = self.link_graph.files[key]
+                for entry in stored['broken']:
+                    self.emit_link_result(entry, False)
+                for entry in stored['skipped']:
+                    self.emit_link_result(entry, None)
+                continue
             
-            for url, line_num in links:
-                if url.startswith('http') or url.startswith('https'):
-                    # 外部链接
-                    if not self.check_external_link(url):
-                        self.broken_links.append({
-                            'file': str(file_path),
-                            'line': line_num,
-                            'url': url,
-                            'type': 'external'
-                        })
+            print(f"检查文件: {file_path}")
+            targets, items = results.setdefault(str(file_path), ([], []))
+            for _, line_num, column, url, link_type in self.collect_links(file_path):
+                entry = {
+                    'file': str(file_path),
+                    'line': line_num,
+                    'column': column,
+                    'url': url,
+                    'type': link_type
+                }
+                record = {**entry, 'target': None, 'status': None}
+                items.append((entry, record))
+                if link_type == 'external':
+                    pending_external.setdefault(url, []).append((entry, record))
+                    continue
+                
+                if link_type == 'reference':
+                    valid = False
                 else:
-                    # 内部链接
-                    if not self.check_internal_link(url, file_path):
-                        self.broken_links.append({
-                            'file': str(file_path),
-                            'line': line_num,
-                            'url': url,
-                            'type': 'internal'
-                        })
+                    valid = self.check_internal_link(url, file_path)
+                    record['target'] = file_index.resolve(url, file_path) or file_index.normalize(url, file_path)
+                    targets.append(record['target'])
+                record['status'] = self.emit_link_result(entry, valid)
+        
+        def resolve_external(url: str, valid: Optional[bool]):
+            for entry, record in pending_external[url]:
+                record['status'] = self.emit_link_result(entry, valid)
+        
+        # 外部链接去重后检查，每个 URL 的结果一返回就写出
+        if use_async:
+            asyncio.run(self.check_external_links_async(pending_external, on_result=resolve_external))
+        else:
+            for url in pending_external:
+                resolve_external(url, self.check_external_link(url))
+        
+        # 最后按文件顺序汇总结果，并更新链接图和数据库
+        for file_path, key in zip(markdown_files, keys):
+            if key in to_check:
+                targets, items = results.get(str(file_path), ([], []))
+                broken = [entry for entry, record in items if record['status'] == 'broken']
+                skipped = [entry for entry, record in items if record['status'] == 'unknown']
+                if self.link_graph is not None:
+                    self.link_graph.record(key, hashes[key], targets, broken, skipped)
+                if self.link_db is not None:
+                    anchors = self.get_anchor_index().get(key)
+                    self.link_db.update_page(key, hashes.get(key), [record for _, record in items], anchors)
+            else:
+                stored = self.link_graph.files[key]
+                broken, skipped = stored['broken'], stored['skipped']
+            self.broken_links.extend(broken)
+            self.skipped_links.extend(skipped)
+        
+        if self.link_graph is not None:
+            self.link_graph.save()
+        
+        if self.link_db is not None:
+            self.link_db.remove_missing_pages(keys)
+            self.link_db.commit()
+            print(f"链接数据已写入 {self.link_db.db_file}")
+        
+        if self.cache is not None:
+            self.cache.save()
+            print(f"外部链接缓存: 命中 {self.cache.hits}, 重新验证 {self.cache.revalidated}, 未命中 {self.cache.misses}")
+        
+        if self.cassette is not None:
+            if self.cassette.replaying:
+                print(f"离线回放: 命中 {self.cassette.hits}, 未录制 {self.cassette.misses}")
+            else:
+                self.cassette.save()
+                print(f"已录制 {len(self.cassette.entries)} 个外部链接结果到 {self.cassette.cassette_file}")
+    
+    def emit_link_result(self, entry: Dict, valid: Optional[bool]) -> str:
+        """判定单个链接的状态，流式输出时立即写出失效和未能确认的链接"""
+        if valid is None:
+            # 被限流或主机熔断，结果未知，不计为失效链接
+            if self.stream is not None:
+                self.stream.emit('skipped', entry)
+            return 'unknown'
+        if not valid:
+            if self.stream is not None:
+                self.stream.emit('broken', entry, breakdown=('type',))
+            return 'broken'
+        return 'ok'
     
     def generate_link_mapping(self):
         """生成链接映射"""
@@ -181,49 +1137,120 @@ class LinkChecker:
         
         self.link_mapping = {**component_mapping, **guide_mapping}
     
+    def get_repair_index(self) -> RepairIndex:
+        """获取链接修复索引"""
+        if self.repair_index is None:
+            aliases = {name: Path(os.path.relpath(path, self.docs_dir)).as_posix()
+                       for name, path in self.link_mapping.items()}
+            self.repair_index = RepairIndex().build(self.get_file_index(), self.lib_dir, aliases)
+        return self.repair_index
+    
+    def suggest_link(self, url: str, current_file: Path) -> Optional[Tuple[str, float, List[Tuple[str, float]]]]:
+        """为失效的内部链接推荐修复目标，返回 (新链接, 得分, 候选列表)"""
+        file_index = self.get_file_index()
+        path, _, fragment = url.partition('#')
+        if not path or file_index.resolve(path, current_file) is not None:
+            # 页内锚点，或路径有效、只是锚点失效，不改写路径
+            return None
+        
+        normalized = file_index.normalize(path, current_file)
+        stem = posixpath.splitext(posixpath.basename(normalized))[0]
+        candidates = self.get_repair_index().search(stem, context=normalized)
+        if not candidates or candidates[0][1] < self.min_repair_score:
+            return None
+        
+        target, score = candidates[0]
+        current_dir = posixpath.dirname(file_index.relative_key(current_file))
+        new_url = posixpath.relpath(target, current_dir or '.')
+        if fragment and self.get_anchor_index().has_anchor(target, fragment):
+            new_url = f"{new_url}#{fragment}"
+        return new_url, score, candidates
+    
     def fix_broken_links(self):
-        """修复失效的链接"""
+        """修复失效的链接（按文件分组，每个文件只读写一次）"""
+        fixes_by_file: Dict[str, List[Dict]] = {}
         for broken_link in self.broken_links:
+            if broken_link['type'] != 'internal':
+                continue
+            
             file_path = broken_link['file']
-            line_num = broken_link['line']
             url = broken_link['url']
             
-            # 尝试从映射中找到正确的链接
-            for key, correct_path in self.link_mapping.items():
-                if key.lower() in url.lower():
-                    # 修复链接
-                    self.fix_link_in_file(file_path, line_num, url, correct_path)
-                    self.fixed_links.append({
-                        'file': file_path,
-                        'line': line_num,
-                        'old_url': url,
-                        'new_url': correct_path
-                    })
-                    break
-    
-    def fix_link_in_file(self, file_path: str, line_num: int, old_url: str, new_url: str):
-        """在文件中修复链接"""
+            # 从修复索引中查找最接近的真实文档
+            suggestion = self.suggest_link(url, Path(file_path))
+            if suggestion is None:
+                continue
+            
+            new_url, score, candidates = suggestion
+            fixes_by_file.setdefault(file_path, []).append({
+                'file': file_path,
+                'line': broken_link['line'],
+                'column': broken_link['column'],
+                'old_url': url,
+                'new_url': new_url,
+                'score': round(score, 3),
+                'candidates': [{'target': target, 'score': round(value, 3)} for target, value in candidates]
+            })
+        
+        for file_path, fixes in fixes_by_file.items():
+            applied = self.fix_links_in_file(file_path, fixes)
+            self.fixed_links.extend(applied)
+            if self.stream is not None:
+                for fix in applied:
+                    self.stream.emit('fixed', fix)
+    
+    def fix_links_in_file(self, file_path: str, fixes: List[Dict]) -> List[Dict]:
+        """在一次读写中应用同一文件的所有修复，返回实际生效的修复"""
+        applied = []
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
+            with open(file_path, 'r', encoding='utf-8', newline='') as f:
                 lines = f.readlines()
             
-            # 修复链接
-            line = lines[line_num - 1]
-            fixed_line = line.replace(f'({old_url})', f'({new_url})')
-            lines[line_num - 1] = fixed_line
+            # 同一行内从右往左替换，避免前面的替换改变后面链接的列号
+            for fix in sorted(fixes, key=lambda item: (item['line'], -item['column'])):
+                index = fix['line'] - 1
+                start = fix['column'] - 1
+                old_url = fix['old_url']
+                if index >= len(lines) or lines[index][start:start + len(old_url)] != old_url:
+                    print(f"{file_path}:{fix['line']}:{fix['column']} 的内容已变化，跳过修复 {old_url}")
+                    continue
+                line = lines[index]
+                lines[index] = line[:start] + fix['new_url'] + line[start + len(old_url):]
+                applied.append(fix)
             
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.writelines(lines)
-                
+            if applied:
+                write_file_atomic(file_path, ''.join(lines))
+        
         except Exception as e:
             print(f"修复文件 {file_path} 中的链接时出错: {e}")
+            return []
+        
+        applied.sort(key=lambda item: (item['line'], item['column']))
+        return applied
     
     def generate_report(self):
-        """生成检查报告"""
+        """生成检查报告（流式输出时只写出由计数器得出的汇总记录）"""
+        if self.stream is not None:
+            counts = self.stream.counts
+            self.stream.summary({
+                'total_broken_links': counts['broken'],
+                'total_fixed_links': counts['fixed'],
+                'total_skipped_links': counts['skipped'],
+                'broken_by_type': self.stream.breakdown('broken', 'type')
+            })
+            print(f"发现 {counts['broken']} 个失效链接")
+            print(f"修复了 {counts['fixed']} 个链接")
+            if counts['skipped']:
+                print(f"{counts['skipped']} 个外部链接因限流、熔断或离线未能确认")
+            print(f"流式报告已写入 {self.stream.path}")
+            return
+        
         report = {
             'total_broken_links': len(self.broken_links),
             'total_fixed_links': len(self.fixed_links),
+            'total_skipped_links': len(self.skipped_links),
             'broken_links': self.broken_links,
+            'skipped_links': self.skipped_links,
             'fixed_links': self.fixed_links,
             'link_mapping': self.link_mapping
         }
@@ -233,25 +1260,122 @@ class LinkChecker:
         
         print(f"发现 {len(self.broken_links)} 个失效链接")
         print(f"修复了 {len(self.fixed_links)} 个链接")
+        if self.skipped_links:
+            print(f"{len(self.skipped_links)} 个外部链接因限流、熔断或离线未能确认")
         print("详细报告已保存到 link-check-report.json")
 
+def run_query(args):
+    """查询链接数据库并输出结果"""
+    if not args.db or not Path(args.db).exists():
+        print("请使用 --db 指定已生成的链接数据库")
+        return
+    if args.query in ('inbound', 'outbound') and not args.page:
+        print(f"{args.query} 查询需要 --page 参数")
+        return
+    
+    db = LinkDatabase(args.db, args.docs_dir)
+    if args.query == 'orphans':
+        rows = db.orphans()
+        print(f"孤立页面 ({len(rows)}):")
+        for (path,) in rows:
+            print(f"  {path}")
+    elif args.query == 'hubs':
+        print("枢纽页面 (入链 / 出链):")
+        for path, inbound, outbound in db.hubs():
+            print(f"  {path}: {inbound} / {outbound}")
+    elif args.query == 'domains':
+        print("外部域名 (链接数 / 页面数 / 失效数):")
+        for domain, count, pages, broken in db.domains():
+            print(f"  {domain}: {count} / {pages} / {broken}")
+    elif args.query == 'broken':
+        for source, line, url, link_type in db.broken():
+            print(f"  {source}:{line} [{link_type}] {url}")
+    elif args.query == 'inbound':
+        rows = db.inbound(args.page)
+        print(f"链接到 {args.page} 的位置 ({len(rows)}):")
+        for source, line, url, status in rows:
+            print(f"  {source}:{line} {url} ({status})")
+    else:
+        rows = db.outbound(args.page)
+        print(f"{args.page} 中的链接 ({len(rows)}):")
+        for line, url, link_type, status in rows:
+            print(f"  {line}: [{link_type}] {url} ({status})")
+    db.close()
+
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description="ZephyrUI 文档链接检查工具")
+    parser.add_argument('--docs-dir', '-d', default='doc', help='文档目录')
+    parser.add_argument('--async', dest='use_async', action='store_true', help='并发检查外部链接')
+    parser.add_argument('--workers', '-w', type=int, default=16, help='并发检查的最大连接数')
+    parser.add_argument('--host-limit', type=int, default=4, help='每个主机的最大并发数')
+    parser.add_argument('--host-rate', type=float, default=5.0, help='每个主机每秒最多请求数')
+    parser.add_argument('--retries', type=int, default=3, help='限流（429/503）时的最大重试次数')
+    parser.add_argument('--cache', default='.link-cache.json', help='外部链接缓存文件')
+    parser.add_argument('--no-cache', action='store_true', help='不使用外部链接缓存')
+    parser.add_argument('--cache-ttl', type=float, default=24 * 3600, help='缓存有效期（秒）')
+    parser.add_argument('--cache-size', type=int, default=5000, help='缓存最大条目数')
+    parser.add_argument('--incremental', '-i', action='store_true', help='只检查变化的文件及链接到它们的文件')
+    parser.add_argument('--graph', default='.link-graph.json', help='增量检查使用的链接图文件')
+    parser.add_argument('--db', help='把链接、锚点和检查结果写入 SQLite 数据库')
+    parser.add_argument('--query', choices=['orphans', 'hubs', 'domains', 'broken', 'inbound', 'outbound'],
+                        help='直接查询 --db 指定的数据库，不重新扫描文档')
+    parser.add_argument('--page', help='inbound/outbound 查询的页面路径')
+    parser.add_argument('--ndjson', metavar='FILE', help='以 NDJSON 流式输出检查结果')
+    cassette_group = parser.add_mutually_exclusive_group()
+    cassette_group.add_argument('--record', metavar='FILE', help='把外部链接检查结果录制到文件')
+    cassette_group.add_argument('--replay', metavar='FILE', help='从录制文件回放外部链接结果，不访问网络')
+    
+    args = parser.parse_args()
+    
+    if args.query:
+        run_query(args)
+        return
+    
+    if args.replay and not Path(args.replay).exists():
+        print(f"录制文件 {args.replay} 不存在，请先使用 --record 录制")
+        return
+    
     print("开始检查 ZephyrUI 文档链接...")
     
-    checker = LinkChecker()
+    cache = None
+    if not args.no_cache:
+        cache = ExternalLinkCache(args.cache, ttl=args.cache_ttl, max_entries=args.cache_size)
+        cache.load()
+    
+    scheduler = HostScheduler(per_host_limit=args.host_limit, rate=args.host_rate,
+                              burst=max(1.0, args.host_rate), max_retries=args.retries)
+    
+    link_graph = None
+    if args.incremental:
+        link_graph = LinkGraph(args.graph)
+        link_graph.load()
+    
+    link_db = LinkDatabase(args.db, args.docs_dir) if args.db else None
+    
+    cassette = None
+    if args.record or args.replay:
+        cassette = LinkCassette(args.record or args.replay, mode='record' if args.record else 'replay')
+        cassette.load()
+    
+    stream = NdjsonReportWriter(args.ndjson, 'link-checker') if args.ndjson else None
+    
+    checker = LinkChecker(args.docs_dir, max_workers=args.workers, cache=cache, scheduler=scheduler,
+                          link_graph=link_graph, link_db=link_db, cassette=cassette, stream=stream)
     
     # 生成链接映射
     checker.generate_link_mapping()
     
     # 检查所有链接
-    checker.check_all_links()
+    checker.check_all_links(use_async=args.use_async)
     
     # 修复失效链接
     checker.fix_broken_links()
     
     # 生成报告
     checker.generate_report()
+    if stream is not None:
+        stream.close()
     
     print("链接检查完成!")
 
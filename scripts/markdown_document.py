@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+ZephyrUI Markdown 文档模型
+一次扫描得到 frontmatter、标题大纲、代码块、表格、链接和段落（均带行号），
+供质量检查规则共享，避免每条规则各自重新扫描全文
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Set
+
+from markdown_links import FENCE_PATTERN, FenceTracker, LinkToken, line_links
+
+HEADING_PATTERN = re.compile(r'^(#{1,6})(?:[ \t]+(.*?))?[ \t]*$')
+
+def iter_buffer_lines(buffer) -> Iterator[str]:
+    """按 \\n 逐行解码字节缓冲区（如 mmap），每次只复制一行，行尾的 \\r 去掉，与文本模式读取一致"""
+    length = len(buffer)
+    start = 0
+    while True:
+        end = buffer.find(b'\n', start)
+        if end < 0:
+            end = length
+        line = buffer[start:end]
+        if line.endswith(b'\r'):
+            line = line[:-1]
+        yield line.decode('utf-8')
+        if end == length:
+            return
+        start = end + 1
+
+@dataclass
+class Heading:
+    """ATX 标题"""
+    line: int
+    level: int
+    text: str
+    raw: str  # 整行原文，如 "## 🎯 组件概述"
+
+@dataclass
+class CodeFence:
+    """围栏代码块"""
+    line: int  # 开启围栏所在行
+    info: str  # 语言标识，未标识时为空
+    end_line: Optional[int] = None  # 闭合围栏所在行，未闭合时为 None
+
+@dataclass
+class TableRow:
+    """表格行"""
+    line: int
+    cells: List[str]
+
+@dataclass
+class Paragraph:
+    """由连续非空文本行组成的段落"""
+    line: int
+    end_line: int
+    text: str
+
+@dataclass
+class MarkdownDocument:
+    """单个 Markdown 文件的解析结果"""
+    path: str
+    lines: List[str]
+    size: int
+    has_frontmatter: bool = False  # 文件以 --- 开头
+    frontmatter: Optional[str] = None  # frontmatter 正文，未闭合时为 None
+    frontmatter_end_line: int = 0
+    headings: List[Heading] = field(default_factory=list)
+    fences: List[CodeFence] = field(default_factory=list)
+    table_rows: List[TableRow] = field(default_factory=list)
+    links: List[LinkToken] = field(default_factory=list)
+    paragraphs: List[Paragraph] = field(default_factory=list)
+    lead: Optional[str] = None  # frontmatter 之后的导语（文档描述），到第一个章节标题为止
+    lead_line: int = 0
+    scope: Optional[Set[int]] = None  # 只检查这些行（如 PR 改动的行），None 表示整个文件
+
+    @classmethod
+    def parse(cls, content: str, path: str = '', detect_frontmatter: bool = True) -> 'MarkdownDocument':
+        """逐行扫描一次构建文档模型"""
+        return cls.parse_lines(content.split('\n'), path, len(content.encode('utf-8')),
+                               detect_frontmatter=detect_frontmatter)
+
+    @classmethod
+    def parse_buffer(cls, buffer, path: str = '') -> 'MarkdownDocument':
+        """从字节缓冲区（如 mmap）逐行解码构建文档模型，大小取缓冲区长度"""
+        return cls.parse_lines(list(iter_buffer_lines(buffer)), path, len(buffer))
+
+    @classmethod
+    def parse_lines(cls, lines: List[str], path: str = '', size: int = 0,
+                    detect_frontmatter: bool = True) -> 'MarkdownDocument':
+        """从已切分的行构建文档模型"""
+        doc = cls(path=path, lines=lines, size=size)
+
+        fences = FenceTracker()
+        frontmatter_lines: Optional[List[str]] = None
+        paragraph: List[str] = []
+        paragraph_start = 0
+
+        def close_paragraph(end_line: int):
+            if paragraph:
+                doc.paragraphs.append(Paragraph(paragraph_start, end_line, '\n'.join(paragraph)))
+                paragraph.clear()
+
+        for line_num, raw_line in enumerate(lines, 1):
+            line = raw_line.rstrip('\r')
+
+            if line_num == 1 and detect_frontmatter and line.startswith('---'):
+                doc.has_frontmatter = True
+                frontmatter_lines = [line[3:]]
+                continue
+            if frontmatter_lines is not None:
+                if line.startswith('---'):
+                    doc.frontmatter = '\n'.join(frontmatter_lines)
+                    doc.frontmatter_end_line = line_num
+                    frontmatter_lines = None
+                else:
+                    frontmatter_lines.append(line)
+                continue
+
+            was_in_code = fences.in_code
+            if fences.update(line):
+                close_paragraph(line_num - 1)
+                if not was_in_code:
+                    match = FENCE_PATTERN.match(line)
+                    doc.fences.append(CodeFence(line_num, line[match.end():].strip()))
+                elif not fences.in_code:
+                    doc.fences[-1].end_line = line_num
+                continue
+
+            if not line.strip():
+                close_paragraph(line_num - 1)
+                continue
+
+            heading = HEADING_PATTERN.match(line)
+            if heading:
+                close_paragraph(line_num - 1)
+                doc.headings.append(Heading(line_num, len(heading.group(1)), heading.group(2) or '', line))
+            elif line.strip().startswith('|'):
+                close_paragraph(line_num - 1)
+                doc.table_rows.append(TableRow(line_num, [cell.strip() for cell in line.split('|')]))
+            else:
+                if not paragraph:
+                    paragraph_start = line_num
+                paragraph.append(line)
+
+            doc.links.extend(line_links(line, line_num))
+
+        if frontmatter_lines is not None:
+            # frontmatter 没有闭合时按普通正文重新解析，只保留“以 --- 开头”的标记
+            doc = cls.parse_lines(lines, path, size, detect_frontmatter=False)
+            doc.has_frontmatter = True
+            return doc
+
+        close_paragraph(len(lines))
+        doc.find_lead()
+        return doc
+
+    def find_lead(self):
+        """线性扫描 frontmatter 之后的导语
+
+        导语从 frontmatter 结束行后的空行之后开始，遇到以 ## 开头的行，
+        或“空行 + 以 # 开头的行”时结束
+        """
+        lines = self.lines
+        end = self.frontmatter_end_line
+        if self.frontmatter is None or lines[end - 1] != '---' or end >= len(lines) or lines[end] != '':
+            return
+
+        start = end + 1  # 导语第一行的下标（从0开始）
+        for index in range(start, len(lines) - 1):
+            next_line = lines[index + 1]
+            if next_line.startswith('##') or (next_line == '' and index + 2 < len(lines)
+                                              and lines[index + 2].startswith('#')):
+                lead = '\n'.join(lines[start:index + 1])
+                if lead:
+                    self.lead = lead
+                    self.lead_line = start + 1
+                    return
+
+    def in_scope(self, line: int) -> bool:
+        """判断行是否在检查范围内"""
+        return self.scope is None or line in self.scope
+
+    def sections(self, level: int = 2) -> List[Heading]:
+        """指定级别的标题"""
+        return [heading for heading in self.headings if heading.level == level]
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+ZephyrUI 文档链接提取工具
+逐行扫描Markdown，跳过代码块和行内代码，输出带行号和列号的链接记录
+"""
+
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional
+
+# 行内链接目标: (url "title")
+_DESTINATION = r'\(\s*(<[^>\n]*>|[^)\s]+)(?:\s+(?:"[^"]*"|\'[^\']*\'|\([^)]*\)))?\s*\)'
+# 图片: ![alt](url)，先于链接匹配，徽章 [![alt](img)](url) 中的图片作为链接文本
+IMAGE_PATTERN = re.compile(r'!\[([^\]]*)\]' + _DESTINATION)
+# 行内链接: [text](url "title")
+INLINE_PATTERN = re.compile(r'\[([^\]]*)\]' + _DESTINATION)
+# 引用式链接: [text][label] / [text][]
+REFERENCE_PATTERN = re.compile(r'(!?)\[([^\]]+)\]\[([^\]]*)\]')
+# 链接定义: [label]: url
+DEFINITION_PATTERN = re.compile(r'^ {0,3}\[([^\]]+)\]:\s*(<[^>\n]*>|\S+)')
+# 自动链接: <https://example.com>
+AUTOLINK_PATTERN = re.compile(r'<((?:https?|ftp|mailto):[^>\s]+)>', re.IGNORECASE)
+# HTML 链接: <a href="url">
+HTML_LINK_PATTERN = re.compile(r'<a\s[^>]*?href\s*=\s*(["\'])(.*?)\1', re.IGNORECASE)
+INLINE_CODE_PATTERN = re.compile(r'(`+)(.+?)(?<!`)\1(?!`)')
+FENCE_PATTERN = re.compile(r'^ {0,3}(`{3,}|~{3,})')
+
+@dataclass
+class LinkToken:
+    """链接记录"""
+    kind: str  # inline / image / reference / definition / autolink / html
+    url: str  # 引用式链接为空，使用 label
+    text: str
+    line: int
+    column: int  # url 在行内的起始列（从1开始），引用式链接为 [ 的位置
+    label: Optional[str] = None
+
+def normalize_label(label: str) -> str:
+    """规范化引用标签（大小写不敏感，合并空白）"""
+    return ' '.join(label.split()).lower()
+
+class FenceTracker:
+    """跟踪围栏代码块状态"""
+
+    def __init__(self):
+        self.fence: Optional[str] = None
+
+    @property
+    def in_code(self) -> bool:
+        return self.fence is not None
+
+    def update(self, line: str) -> bool:
+        """处理一行，若该行属于代码块（包括围栏行本身）则返回 True"""
+        match = FENCE_PATTERN.match(line)
+        if self.fence is None:
+            if match:
+                self.fence = match.group(1)
+                return True
+            return False
+
+        # 闭合围栏必须使用相同字符，长度不短于开启围栏，且后面没有其他内容
+        if match and match.group(1)[0] == self.fence[0] and len(match.group(1)) >= len(self.fence) \
+                and not line[match.end():].strip():
+            self.fence = None
+        return True
+
+def mask_inline_code(line: str) -> str:
+    """把行内代码替换为等长空白，保留列号"""
+    if '`' not in line:
+        return line
+    return INLINE_CODE_PATTERN.sub(lambda m: ' ' * len(m.group(0)), line)
+
+def _strip_angle(url: str, start: int):
+    """去掉 <url> 形式的尖括号，返回 (url, 起始下标)"""
+    if url.startswith('<') and url.endswith('>'):
+        return url[1:-1], start + 1
+    return url, start
+
+def line_links(line: str, line_num: int) -> List[LinkToken]:
+    """提取单行（代码块之外）中的链接记录，按列号排序
+
+    徽章 [![alt](img.svg)](url) 产出两条记录：指向 img.svg 的 image，
+    和指向 url、文本为 ![alt](img.svg) 的 inline
+    """
+    line = mask_inline_code(line)
+    if '[' not in line and '<' not in line:
+        return []
+
+    tokens = []
+
+    definition = DEFINITION_PATTERN.match(line)
+    if definition:
+        url, start = _strip_angle(definition.group(2), definition.start(2))
+        tokens.append(LinkToken('definition', url, definition.group(1), line_num, start + 1,
+                                normalize_label(definition.group(1))))
+    else:
+        # 图片匹配后替换为等长空白，外层链接的文本从原始行中取
+        masked = line
+        if '![' in line:
+            for match in IMAGE_PATTERN.finditer(line):
+                url, start = _strip_angle(match.group(2), match.start(2))
+                tokens.append(LinkToken('image', url, match.group(1), line_num, start + 1))
+            masked = IMAGE_PATTERN.sub(lambda m: ' ' * len(m.group(0)), line)
+
+        for match in INLINE_PATTERN.finditer(masked):
+            url, start = _strip_angle(match.group(2), match.start(2))
+            tokens.append(LinkToken('inline', url, line[match.start(1):match.end(1)], line_num, start + 1))
+
+        for match in REFERENCE_PATTERN.finditer(masked):
+            text = line[match.start(2):match.end(2)]
+            label = match.group(3) or text
+            tokens.append(LinkToken('reference', '', text, line_num, match.start() + 1,
+                                    normalize_label(label)))
+
+    for match in AUTOLINK_PATTERN.finditer(line):
+        tokens.append(LinkToken('autolink', match.group(1), match.group(1), line_num, match.start(1) + 1))
+
+    for match in HTML_LINK_PATTERN.finditer(line):
+        tokens.append(LinkToken('html', match.group(2), '', line_num, match.start(2) + 1))
+
+    tokens.sort(key=lambda token: token.column)
+    return tokens
+
+def iter_links(lines: Iterable[str]) -> Iterator[LinkToken]:
+    """逐行扫描，按出现顺序产出链接记录"""
+    fences = FenceTracker()
+
+    for line_num, raw_line in enumerate(lines, 1):
+        line = raw_line.rstrip('\r\n')
+        if fences.update(line):
+            continue
+        yield from line_links(line, line_num)
+
+def iter_file_links(file_path: Path) -> Iterator[LinkToken]:
+    """流式读取文件并产出链接记录"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        yield from iter_links(f)
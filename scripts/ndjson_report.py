@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+ZephyrUI 文档工具的流式报告输出
+每产生一条结果就写出一行 JSON（NDJSON），运行中断时已写出的记录仍然可用，
+结束时的汇总由运行中维护的计数器得出，不需要保留全部结果
+"""
+
+import json
+import threading
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+class NdjsonReportWriter:
+    """逐行写出报告记录，并维护按记录类型、字段取值和数值字段的计数器"""
+
+    def __init__(self, path: str, tool: str):
+        self.path = path
+        self.tool = tool
+        # 每条记录的类型计数，如 issue -> 12
+        self.counts: Counter = Counter()
+        # 按字段取值分组的计数，如 issue.severity -> {'minor': 10, 'major': 2}
+        self.breakdowns: Dict[str, Counter] = defaultdict(Counter)
+        # 数值字段的累计值，如 file.total_score -> 1234.5
+        self.totals: Dict[str, float] = defaultdict(float)
+        self._lock = threading.Lock()
+        # 行缓冲，每条记录写出后立即落盘
+        self._file = open(path, 'w', encoding='utf-8', buffering=1)
+        self.emit('start', {'tool': tool, 'timestamp': datetime.now().isoformat()})
+
+    def emit(self, record_type: str, data: Dict, breakdown: Iterable[str] = (), totals: Iterable[str] = ()):
+        """写出一条记录，并按 breakdown 字段计数、按 totals 字段累加"""
+        line = json.dumps({'type': record_type, **data}, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + '\n')
+            self.counts[record_type] += 1
+            for field in breakdown:
+                self.breakdowns[f"{record_type}.{field}"][data.get(field)] += 1
+            for field in totals:
+                self.totals[f"{record_type}.{field}"] += data.get(field) or 0
+
+    def breakdown(self, record_type: str, field: str) -> Dict:
+        """获取某类记录按字段取值的计数"""
+        return dict(self.breakdowns.get(f"{record_type}.{field}", {}))
+
+    def total(self, record_type: str, field: str) -> float:
+        """获取某类记录数值字段的累计值"""
+        return self.totals.get(f"{record_type}.{field}", 0.0)
+
+    def summary(self, data: Optional[Dict] = None):
+        """写出汇总记录"""
+        self.emit('summary', {'counts': dict(self.counts), **(data or {})})
+
+    def close(self):
+        """关闭输出文件"""
+        self._file.close()
+
+    def __enter__(self) -> 'NdjsonReportWriter':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -12,9 +12,12 @@ from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 import argparse
 
+from ndjson_report import NdjsonReportWriter
+
 class DocsUpdater:
-    def __init__(self, docs_dir: str = "docs"):
+    def __init__(self, docs_dir: str = "docs", stream: Optional[NdjsonReportWriter] = None):
         self.docs_dir = Path(docs_dir)
+        self.stream = stream
         self.updated_files = []
         self.update_stats = {
             'total_files': 0,
@@ -323,7 +326,10 @@ class DocsUpdater:
             updated = True
         
         if updated:
-            self.updated_files.append(str(file_path))
+            if self.stream is not None:
+                self.stream.emit('updated_file', {'file_path': str(file_path)})
+            else:
+                self.updated_files.append(str(file_path))
         
         return updated
     
@@ -340,7 +346,12 @@ class DocsUpdater:
             self.update_single_file(file_path, version)
     
     def generate_update_report(self) -> None:
-        """生成更新报告"""
+        """生成更新报告（流式输出时只写出汇总记录）"""
+        if self.stream is not None:
+            self.stream.summary({'update_stats': self.update_stats})
+            print(f"流式报告已写入 {self.stream.path}")
+            return
+        
         report = {
             'update_stats': self.update_stats,
             'updated_files': self.updated_files,
@@ -407,10 +418,12 @@ def main():
     parser.add_argument('--pattern', '-p', help='只更新匹配模式的文件')
     parser.add_argument('--check', '-c', action='store_true', help='运行检查')
     parser.add_argument('--docs-dir', '-d', default='doc', help='文档目录')
+    parser.add_argument('--ndjson', metavar='FILE', help='以 NDJSON 流式输出更新结果')
     
     args = parser.parse_args()
     
-    updater = DocsUpdater(args.docs_dir)
+    stream = NdjsonReportWriter(args.ndjson, 'update-docs') if args.ndjson and not args.check else None
+    updater = DocsUpdater(args.docs_dir, stream=stream)
     
     if args.check:
         updater.run_checks()
@@ -422,6 +435,8 @@ def main():
         
         # 生成更新报告
         updater.generate_update_report()
+        if stream is not None:
+            stream.close()
         
         print("文档更新完成!")
         print(f"更新了 {updater.update_stats['updated_files']} 个文件")